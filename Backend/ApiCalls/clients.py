@@ -0,0 +1,278 @@
+'''
+Shared clients for every external API the backend talks to.
+
+- one pooled, keep-alive SarvamAI client per process (httpx under the hood)
+- one pooled requests.Session for plain HTTP (Google Input Tools, OCR.space)
+- call(dependency, endpoint, fn, ...) wraps a request with bounded retries
+  (full-jitter exponential backoff), a per-dependency circuit breaker and
+  per-endpoint latency / error counters.
+'''
+import os
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 16))
+SARVAM_TIMEOUT = float(os.getenv("SARVAM_TIMEOUT", 60))
+CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", 5))
+
+RETRY_ATTEMPTS = int(os.getenv("API_RETRY_ATTEMPTS", 3))
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 4.0
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", 30))
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+# --------------------------------------------------
+# CIRCUIT BREAKER
+# --------------------------------------------------
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+# --------------------------------------------------
+# METRICS
+# --------------------------------------------------
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "avg_ms": round(1000 * self.total_seconds / self.calls, 1) if self.calls else 0.0,
+            "max_ms": round(1000 * self.max_seconds, 1)
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+# Optional hook(dependency, endpoint, seconds, ok) for external metrics sinks
+observers = []
+
+
+def _endpoint_stats(dependency, endpoint) -> EndpointStats:
+    key = (dependency, endpoint)
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = EndpointStats()
+        return stats
+
+
+def stats() -> dict:
+    with _stats_lock:
+        endpoints = {f"{dep}.{ep}": s.as_dict() for (dep, ep), s in _stats.items()}
+    return {
+        "endpoints": endpoints,
+        "breakers": {name: b.state for name, b in breakers.items()}
+    }
+
+
+# --------------------------------------------------
+# RETRIES
+# --------------------------------------------------
+def _status_code(exc):
+    response = getattr(exc, "response", None)
+    if response is not None and getattr(response, "status_code", None):
+        return response.status_code
+    return getattr(exc, "status_code", None)
+
+
+def is_retryable(exc) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    return _status_code(exc) in RETRYABLE_STATUS
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Full jitter: uniform in [0, min(max, base * 2^attempt)]
+    """
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+breakers = {
+    "sarvam": CircuitBreaker("sarvam"),
+    "google_input_tools": CircuitBreaker("google_input_tools"),
+    "ocr_space": CircuitBreaker("ocr_space"),
+}
+
+
+def call(dependency, endpoint, fn, *args, attempts=RETRY_ATTEMPTS, **kwargs):
+    """
+    Calls fn(*args, **kwargs) through dependency's circuit breaker, retrying
+    transient failures (connection errors, timeouts, 429/5xx) with jittered
+    backoff. Raises CircuitOpen without calling fn while the breaker is open.
+    """
+    breaker = breakers.setdefault(dependency, CircuitBreaker(dependency))
+    stats = _endpoint_stats(dependency, endpoint)
+
+    if not breaker.allow():
+        stats.rejected += 1
+        raise CircuitOpen(f"{dependency} is unavailable (circuit open)")
+
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            _record(dependency, endpoint, stats, elapsed, ok=False)
+
+            if attempt + 1 < attempts and is_retryable(e):
+                stats.retries += 1
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            # Client errors (4xx other than 429) say nothing about the
+            # dependency's health, so they do not trip the breaker.
+            if is_retryable(e) or _status_code(e) is None:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+
+        _record(dependency, endpoint, stats, time.perf_counter() - start, ok=True)
+        breaker.record_success()
+        return result
+
+
+def _record(dependency, endpoint, stats, elapsed, ok):
+    stats.calls += 1
+    stats.total_seconds += elapsed
+    stats.max_seconds = max(stats.max_seconds, elapsed)
+    if not ok:
+        stats.errors += 1
+    for observer in observers:
+        observer(dependency, endpoint, elapsed, ok)
+
+
+# --------------------------------------------------
+# CLIENTS
+# --------------------------------------------------
+_session = None
+_sarvam_client = None
+_clients_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Process-wide requests.Session so plain HTTP calls reuse TCP/TLS
+    connections instead of handshaking on every request.
+    """
+    global _session
+    with _clients_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_sarvam_client():
+    """
+    Process-wide SarvamAI client backed by a pooled, keep-alive httpx client
+    """
+    global _sarvam_client
+    with _clients_lock:
+        if _sarvam_client is None:
+            from sarvamai import SarvamAI
+
+            api_key = os.getenv("SARVAM_API_KEY")
+            if not api_key:
+                raise RuntimeError("SARVAM_API_KEY not set")
+
+            http_client = httpx.Client(
+                timeout=httpx.Timeout(SARVAM_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_SIZE,
+                    max_keepalive_connections=HTTP_POOL_SIZE
+                )
+            )
+            _sarvam_client = SarvamAI(api_subscription_key=api_key, httpx_client=http_client)
+        return _sarvam_client
+
+
+class LazySarvamClient:
+    """
+    Stands in for get_sarvam_client() until the first API call, so the app
+    imports without the SDK or SARVAM_API_KEY and no pooled connection is
+    opened before gunicorn forks its workers
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_sarvam_client(), name)
@@ -1,4 +1,4 @@
-import requests
+from Backend.ApiCalls.clients import call, get_http_session
 
 OCR_API_URL = "https://api.ocr.space/parse/image"
 
@@ -12,17 +12,26 @@ class OCRService:
         language: OCR language code (eng, hin, tam, tel, kan, mal, mar, ben, guj, pan, ori)
         """
 
-        response = requests.post(
-            OCR_API_URL,
-            headers={"apikey": self.api_key},
-            files={"file": (file_storage.filename, file_storage.stream, file_storage.mimetype)},
-            data={
-                "language": language,
-                "OCREngine": 2,   # best engine
-                "detectOrientation": True,
-                "scale": True
-            }
-        )
+        # Buffered so a retried request can resend the upload
+        content = file_storage.read()
+
+        def post():
+            response = get_http_session().post(
+                OCR_API_URL,
+                headers={"apikey": self.api_key},
+                files={"file": (file_storage.filename, content, file_storage.mimetype)},
+                data={
+                    "language": language,
+                    "OCREngine": 2,   # best engine
+                    "detectOrientation": True,
+                    "scale": True
+                },
+                timeout=30
+            )
+            response.raise_for_status()
+            return response
+
+        response = call("ocr_space", "parse_image", post)
 
         result = response.json()
 
@@ -1,16 +1,210 @@
-from sarvamai import SarvamAI
+import os
+import re
+import threading
+from concurrent.futures import Future
 
+from Backend.ApiCalls.clients import call
+from Backend.metrics import timed
 
-def phonetic_help(client, text)-> str:
-    response = client.chat.completions(
-        messages=[
-            {"role": "system", "content": "The user requires help in pronuncing a word in a language that they might not know. First give the neophonetic pronunciation in English, then expalain how to pronunce each syllable."},
-            {"role": "user", "content": "The word I'm trying to pronunce is: "+str(text)}
-        ],
-        temperature=0.5,
-        top_p=1,
-        max_tokens=1000,
+# Bump PROMPT_VERSION whenever SYSTEM_PROMPT, USER_PROMPT or the BATCH_*
+# prompts below change so cached explanations generated with the old wording
+# are not served. Answers from a batched call are cached alongside single-word
+# ones, so the version covers both.
+#   1  single-word prompt only
+#   2  micro-batching (BATCH_SYSTEM_PROMPT / BATCH_USER_PROMPT)
+PROMPT_VERSION = "2"
+SYSTEM_PROMPT = "The user requires help in pronuncing a word in a language that they might not know. First give the neophonetic pronunciation in English, then expalain how to pronunce each syllable."
+USER_PROMPT = "The word I'm trying to pronunce is: "
+
+MODEL_PARAMS = {
+    "temperature": 0.5,
+    "top_p": 1,
+    "max_tokens": 1000,
+}
+
+# --------------------------------------------------
+# MICRO-BATCHING
+# --------------------------------------------------
+# While another explanation is being fetched in this process, new words wait
+# up to PHONETIC_BATCH_WINDOW_MS for company and go out together as one chat
+# call of at most PHONETIC_BATCH_MAX words. A word with nothing else in
+# flight is asked about at once. 0 turns batching off.
+BATCH_WINDOW = float(os.getenv("PHONETIC_BATCH_WINDOW_MS", 30)) / 1000
+BATCH_MAX_WORDS = int(os.getenv("PHONETIC_BATCH_MAX", 8))
+# A batch gets the single-word output budget per word, up to this
+BATCH_MAX_TOKENS = int(os.getenv("PHONETIC_BATCH_MAX_TOKENS", 4000))
+
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + " You will be given several numbered words. Answer each word separately and in order: start each answer with a line containing only ### and the word's number (### 1, ### 2, ...), and write nothing before the first answer."
+BATCH_USER_PROMPT = "The words I'm trying to pronunce are:\n"
+
+ANSWER_MARKER = re.compile(r"^[ \t]*#{2,4}[ \t]*(\d+)[ \t]*[.:)]?[ \t]*$", re.MULTILINE)
+
+
+def _ask(client, messages, max_tokens) -> str:
+    response = call(
+        "sarvam", "chat_completions",
+        client.chat.completions,
+        messages=messages,
+        **dict(MODEL_PARAMS, max_tokens=max_tokens),
     )
 
-    print(response)
     return response.choices[0].message.content.strip()
+
+
+def explain_word(client, text) -> str:
+    return _ask(
+        client,
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT+str(text)}
+        ],
+        MODEL_PARAMS["max_tokens"]
+    )
+
+
+def parse_batch(content: str, count: int) -> dict:
+    """
+    {word number: answer} for the well-formed answers in a batched reply;
+    numbers that are missing, repeated or empty are left out
+    """
+    pieces = ANSWER_MARKER.split(content)
+    answers = {}
+    seen = set()
+
+    for number, answer in zip(pieces[1::2], pieces[2::2]):
+        number = int(number)
+        if number in seen:
+            answers.pop(number, None)
+            continue
+        seen.add(number)
+
+        answer = answer.strip()
+        if 1 <= number <= count and answer:
+            answers[number] = answer
+    return answers
+
+
+def explain_words(client, texts) -> dict:
+    """
+    {text: explanation} from one chat call for several words; words the
+    reply does not answer cleanly are missing
+    """
+    numbered = "\n".join(f"{number}. {text}" for number, text in enumerate(texts, 1))
+    content = _ask(
+        client,
+        [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": BATCH_USER_PROMPT+numbered}
+        ],
+        min(MODEL_PARAMS["max_tokens"] * len(texts), BATCH_MAX_TOKENS)
+    )
+
+    return {texts[number - 1]: answer for number, answer in parse_batch(content, len(texts)).items()}
+
+
+class PhoneticBatcher:
+    """
+    Coalesces concurrent phonetic_help calls for different words. The first
+    caller to open a batch waits out the window (or until the batch is full)
+    and makes the call; the others block on their futures. A word the
+    batched reply does not answer is asked about on its own.
+    """
+
+    def __init__(self, window=BATCH_WINDOW, max_words=BATCH_MAX_WORDS):
+        self.window = window
+        self.max_words = max_words
+
+        self._cond = threading.Condition()
+        # Batch being filled: {text: Future resolving to the answer or None}
+        self._open = None
+        # Callers inside submit(), waiting or calling
+        self._active = 0
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_words = 0
+        self.fallbacks = 0
+
+    def submit(self, client, text) -> str:
+        text = str(text)
+        leader = False
+
+        with self._cond:
+            self.requests += 1
+            batch = self._open
+
+            if batch is not None:
+                future = batch.setdefault(text, Future())
+                if len(batch) >= self.max_words:
+                    self._open = None
+                    self._cond.notify_all()
+            elif self.window > 0 and self.max_words > 1 and self._active:
+                # Other words are being explained, so more are likely on
+                # the way: open a batch for them to join
+                batch = self._open = {text: Future()}
+                future = batch[text]
+                leader = True
+
+            self._active += 1
+
+        try:
+            if batch is None:
+                return explain_word(client, text)
+
+            if leader:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._open is not batch, timeout=self.window)
+                    if self._open is batch:
+                        self._open = None
+                self._run(client, batch)
+
+            answer = future.result()
+            if answer is None:
+                with self._cond:
+                    self.fallbacks += 1
+                answer = explain_word(client, text)
+            return answer
+        finally:
+            with self._cond:
+                self._active -= 1
+
+    def _run(self, client, batch):
+        """
+        Resolves every future in a closed batch; never raises
+        """
+        texts = list(batch)
+        if len(texts) == 1:
+            try:
+                batch[texts[0]].set_result(explain_word(client, texts[0]))
+            except Exception as e:
+                batch[texts[0]].set_exception(e)
+            return
+
+        try:
+            answers = explain_words(client, texts)
+        except Exception as e:
+            print("Batched phonetic help error:", e)
+            answers = {}
+
+        with self._cond:
+            self.batches += 1
+            self.batched_words += len(answers)
+
+        for text, future in batch.items():
+            future.set_result(answers.get(text))
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "batched_words": self.batched_words,
+            "fallbacks": self.fallbacks
+        }
+
+
+batcher = PhoneticBatcher()
+
+
+@timed("phonetic_help")
+def phonetic_help(client, text)-> str:
+    return batcher.submit(client, text)
@@ -1,16 +1,172 @@
-from sarvamai import SarvamAI
+import base64
+import contextlib
+import io
+import os
+import queue
+import threading
+import wave
+
+from Backend.ApiCalls.clients import call, breakers, CircuitOpen
+from Backend.metrics import timed
 
 MODEL = "saarika:v2.5"
 
+# What the browser sends over /check/stream: 16 kHz mono 16-bit PCM
+STREAM_SAMPLE_RATE = 16000
+STREAM_CODEC = "pcm_s16le"
+
+# After the last chunk, how long to wait for Sarvam's final segment
+STREAM_FINAL_TIMEOUT = float(os.getenv("STT_STREAM_FINAL_TIMEOUT", 5))
+
+# "sarvam" streams to Sarvam's websocket; "buffered" collects the audio and
+# makes one batch call at the end (also used when the websocket fails)
+STREAM_BACKEND = os.getenv("STT_STREAM_BACKEND", "sarvam")
+
+
+class _StreamUnavailable(RuntimeError):
+    pass
+
 
 def stt(client, filename, lang_code) -> str:
-    client = SarvamAI(
-        api_subscription_key="sk_rr5djtfm_pEwx0WELS8wWyhI386Ghdpka"
-    )
+    # Read up front so a retried request resends the whole file
+    with open(filename, "rb") as f:
+        audio = f.read()
+
+    return stt_bytes(client, audio, os.path.basename(filename), lang_code)
 
-    response = client.speech_to_text.transcribe(
-        file=open(filename, "rb"),
+
+def stt_bytes(client, audio, filename, lang_code, prepare=True) -> str:
+    # Mono 16 kHz with the silence trimmed off: far smaller uploads and
+    # fewer billed seconds
+    if prepare:
+        # numpy is only loaded once audio actually arrives
+        from Backend.audio_prep import prepare_for_stt
+
+        audio, filename = prepare_for_stt(audio, filename)
+
+    response = call(
+        "sarvam", "speech_to_text",
+        client.speech_to_text.transcribe,
+        file=(filename, audio),
         model= MODEL,
         language_code=lang_code
     )
     return (response.transcript)
+
+
+def pcm_to_wav(pcm: bytes, sample_rate=STREAM_SAMPLE_RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+@timed("stt_stream")
+def stt_stream(client, chunks, lang_code, on_partial=None) -> str:
+    """
+    Forwards PCM chunks (16 kHz mono s16le) to speech-to-text while they are
+    still being recorded and returns the final transcript once chunks is
+    exhausted. on_partial(transcript_so_far) is called for every segment
+    recognised along the way.
+
+    Falls back to one batch call over the buffered audio when streaming is
+    disabled or the websocket cannot be opened.
+    """
+    received = []
+
+    def buffered(source):
+        for chunk in source:
+            received.append(chunk)
+            yield chunk
+
+    if STREAM_BACKEND == "sarvam":
+        breaker = breakers["sarvam"]
+        if not breaker.allow():
+            raise CircuitOpen("sarvam is unavailable (circuit open)")
+
+        try:
+            transcript = _sarvam_stream(client, buffered(chunks), lang_code, on_partial)
+        except _StreamUnavailable as e:
+            breaker.record_failure()
+            print("Streaming STT unavailable, falling back to batch:", e)
+        except Exception:
+            breaker.record_failure()
+            raise
+        else:
+            breaker.record_success()
+            return transcript
+
+    # Drain whatever the client is still sending, then transcribe it at once
+    for _ in buffered(chunks):
+        pass
+
+    pcm = b"".join(received)
+    if not pcm:
+        return ""
+    return stt_bytes(client, pcm_to_wav(pcm), "stream.wav", lang_code)
+
+
+def _sarvam_stream(client, chunks, lang_code, on_partial):
+    with contextlib.ExitStack() as stack:
+        try:
+            ws = stack.enter_context(client.speech_to_text_streaming.connect(
+                language_code=lang_code,
+                model=MODEL,
+                input_audio_codec=STREAM_CODEC,
+                sample_rate=str(STREAM_SAMPLE_RATE),
+                flush_signal="true"
+            ))
+        except Exception as e:
+            raise _StreamUnavailable(e) from e
+
+        segments = []
+        messages = queue.Queue()
+
+        def read():
+            try:
+                for message in ws:
+                    messages.put(message)
+            except Exception as e:
+                messages.put(e)
+            messages.put(None)
+
+        def drain(timeout=None):
+            """
+            Handles every message received so far; with a timeout, first
+            waits up to that long for the next one.
+            """
+            while True:
+                try:
+                    message = messages.get(timeout=timeout) if timeout else messages.get_nowait()
+                except queue.Empty:
+                    return
+                timeout = None
+
+                if message is None:
+                    return
+                if isinstance(message, Exception):
+                    raise message
+                if message.type == "error":
+                    raise RuntimeError(f"Streaming STT error: {message.data}")
+                if message.type == "data" and message.data.transcript:
+                    segments.append(message.data.transcript.strip())
+                    if on_partial:
+                        on_partial(" ".join(segments))
+
+        threading.Thread(target=read, daemon=True).start()
+
+        for chunk in chunks:
+            ws.transcribe(
+                audio=base64.b64encode(chunk).decode("ascii"),
+                encoding="audio/wav",
+                sample_rate=STREAM_SAMPLE_RATE
+            )
+            drain()
+
+        ws.flush()
+        drain(timeout=STREAM_FINAL_TIMEOUT)
+
+    return " ".join(segments)
@@ -1,13 +1,29 @@
-from sarvamai import SarvamAI
-from sarvamai.play import play, save
+import base64
+import contextlib
 import os
 
+from Backend.ApiCalls.clients import call, breakers, CircuitOpen
+from Backend.metrics import timed
 
+MODEL = "bulbul:v2"
+SPEAKER = "anushka"
+VOICE = f"{MODEL}/{SPEAKER}"
+
+# The streaming endpoint only emits MP3
+STREAM_CODEC = "mp3"
+STREAM_BITRATE = "64k"
+
+
+@timed("tts")
 def tts(client, text, lang_code):
 
-    response = client.text_to_speech.convert(
+    response = call(
+        "sarvam", "text_to_speech",
+        client.text_to_speech.convert,
         text=text,
         target_language_code=lang_code,
+        model=MODEL,
+        speaker=SPEAKER,
         enable_preprocessing=True
     )
 
@@ -19,4 +35,66 @@ def tts(client, text, lang_code):
     return response
 
 
+def tts_stream(client, text, lang_code):
+    """
+    Iterator of MP3 bytes from Sarvam's streaming TTS websocket, yielded as
+    each chunk is synthesised so playback can start before the whole word is
+    ready. The breaker check, the connection and the first chunk all happen
+    here, before anything is returned, so a caller can still answer with an
+    error or fall back when Sarvam is down. Not retried (bytes may already
+    be sent once streaming starts) but honours the Sarvam breaker.
+    """
+    breaker = breakers["sarvam"]
+    if not breaker.allow():
+        raise CircuitOpen("sarvam is unavailable (circuit open)")
+
+    stack = contextlib.ExitStack()
+    try:
+        ws = stack.enter_context(
+            client.text_to_speech_streaming.connect(model=MODEL, send_completion_event=True)
+        )
+        ws.configure(
+            target_language_code=lang_code,
+            speaker=SPEAKER,
+            enable_preprocessing=True,
+            output_audio_codec=STREAM_CODEC,
+            output_audio_bitrate=STREAM_BITRATE
+        )
+        ws.convert(text)
+        ws.flush()
+
+        chunks = _audio_chunks(ws)
+        first = next(chunks, None)
+        if first is None:
+            raise RuntimeError("Streaming TTS returned no audio")
+    except BaseException:
+        stack.close()
+        breaker.record_failure()
+        raise
+
+    return _relay(stack, breaker, first, chunks)
+
+
+def _audio_chunks(ws):
+    for message in ws:
+        if message.type == "audio":
+            yield base64.b64decode(message.data.audio)
+        elif message.type == "event" and message.data.event_type == "final":
+            return
+        elif message.type == "error":
+            raise RuntimeError(f"Streaming TTS error: {message.data}")
+
 
+def _relay(stack, breaker, first, chunks):
+    with stack:
+        try:
+            yield first
+            yield from chunks
+        except GeneratorExit:
+            # The listener went away; Sarvam itself was fine
+            breaker.record_success()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+    breaker.record_success()
@@ -1,21 +1,15 @@
 '''
 Docstring for Backend.APICalls.main
-Ideally this file should handle all the authentication for the sarvam api
+Manual STT check: python -m Backend.ApiCalls.main
+Authentication / client setup for the sarvam api lives in clients.py
 '''
-from sarvamai import SarvamAI
 from sarvamai.play import play, save
-import os
-from helpers.speech_to_text import stt
+from Backend.ApiCalls.clients import get_sarvam_client
+from Backend.ApiCalls.helpers.speech_to_text import stt
 
 
 if __name__ == "__main__":
-    SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
-    if not SARVAM_API_KEY:
-        raise KeyError("SARVAM_API_KEY : API key not found. Please set it in enviroment variables")
-
-    client = SarvamAI(
-        api_subscription_key=SARVAM_API_KEY
-    )
+    client = get_sarvam_client()
     transcription  = stt(client, "C:\\Users\\Aakash\\Documents\\DEHack\\output.wav", lang_code="ml-IN")
     print(transcription)
 
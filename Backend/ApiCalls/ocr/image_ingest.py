@@ -0,0 +1,121 @@
+# Backend/ApiCalls/ocr/image_ingest.py
+'''
+Upload → NumPy image decoding with size limits.
+
+Uploads are read straight from the request stream into memory (never via a
+temp file) and refused once they pass MAX_UPLOAD_BYTES. Before decoding, the
+header is inspected so oversized photos are rejected by pixel count and large
+JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg directly; the result is
+finally resized so its longest side is at most MAX_SIDE.
+
+OpenCV, NumPy and Pillow are imported on first decode, so the web process
+can read uploads without loading the imaging stack.
+'''
+import io
+import os
+
+
+MAX_UPLOAD_BYTES = int(os.getenv("OCR_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", 50_000_000))
+MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 2000))
+
+READ_CHUNK = 64 * 1024
+
+# cv2 flags that decode at a fraction of full resolution, largest first
+REDUCED_COLOR = (
+    (8, "IMREAD_REDUCED_COLOR_8"),
+    (4, "IMREAD_REDUCED_COLOR_4"),
+    (2, "IMREAD_REDUCED_COLOR_2"),
+)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def read_upload(file_storage, max_bytes=MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Reads a Flask FileStorage into memory, stopping as soon as it grows past
+    max_bytes instead of buffering the whole body first.
+    """
+    stream = file_storage.stream
+    buf = bytearray()
+
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise ImageTooLarge(f"Image is larger than {max_bytes / (1024 * 1024):g} MB")
+
+    return bytes(buf)
+
+
+def image_size(data: bytes):
+    """
+    (width, height) from the image header, without decoding pixels
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            return im.size
+    except Exception as e:
+        raise InvalidImage("Unsupported or corrupt image") from e
+
+
+def check_image(data: bytes, max_pixels=MAX_PIXELS):
+    """
+    (width, height) of an upload whose header is readable and within the
+    pixel limit. Cheap enough to run in the web process before an OCR job
+    takes a pool slot.
+    """
+    width, height = image_size(data)
+    if width * height > max_pixels:
+        raise ImageTooLarge(f"Image has more than {max_pixels / 1_000_000:g} million pixels")
+    return width, height
+
+
+def decode_image(data: bytes, max_side=MAX_SIDE, max_pixels=MAX_PIXELS):
+    """
+    Decodes encoded image bytes to a BGR array no larger than max_side on
+    its longest edge.
+    """
+    import cv2
+    import numpy as np
+
+    width, height = check_image(data, max_pixels)
+
+    flags = cv2.IMREAD_COLOR
+    longest = max(width, height)
+    for factor, reduced_flag in REDUCED_COLOR:
+        if longest // factor >= max_side:
+            flags = getattr(cv2, reduced_flag)
+            break
+
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    if img is None:
+        raise InvalidImage("Unsupported or corrupt image")
+
+    return downscale(img, max_side)
+
+
+def downscale(img, max_side=MAX_SIDE):
+    import cv2
+
+    h, w = img.shape[:2]
+    longest = max(h, w)
+    if longest <= max_side:
+        return img
+
+    scale = max_side / longest
+    return cv2.resize(
+        img,
+        (max(1, round(w * scale)), max(1, round(h * scale))),
+        interpolation=cv2.INTER_AREA
+    )
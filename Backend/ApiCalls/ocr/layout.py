@@ -0,0 +1,118 @@
+# Backend/ApiCalls/ocr/layout.py
+'''
+Finds the text lines on a page and puts them in reading order.
+
+The page is binarised and its median character height estimated from the
+connected components. A dilation with a wide, short kernel (through
+preprocess.run_pipeline) smears each line into one blob, whose bounding
+boxes are the lines. The boxes are then ordered by a recursive XY-cut:
+a region is split at its widest blank band across the page when that band
+is taller than the spacing between lines (a section or question break),
+otherwise at its widest gutter down the page, until what is left is a
+single column of closely spaced lines (a block). Side-by-side columns and
+answer boxes are therefore read one after the other, not across the gutter.
+'''
+import cv2
+import numpy as np
+
+from .preprocess import run_pipeline
+
+
+BINARIZE = (("threshold", {"otsu": True}),)
+
+# Components outside these bounds are specks, rules or photos, not glyphs
+MIN_CHAR_HEIGHT = 6
+MAX_CHAR_FRACTION = 0.25
+
+# Word gaps narrower than this many character heights are bridged into one
+# line
+LINE_GAP = 2.0
+# Lines closer than this many line heights apart belong to the same block
+BLOCK_GAP = 1.5
+
+
+def char_height(binary) -> int:
+    """
+    Median glyph height in pixels, or 0 when nothing looks like text
+    """
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+
+    page_h, page_w = binary.shape
+    glyphs = heights[
+        (heights >= MIN_CHAR_HEIGHT)
+        & (heights < page_h * MAX_CHAR_FRACTION)
+        & (widths < page_w * MAX_CHAR_FRACTION)
+    ]
+    return int(np.median(glyphs)) if len(glyphs) else 0
+
+
+def union(boxes):
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[0] + b[2] for b in boxes)
+    y1 = max(b[1] + b[3] for b in boxes)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def _split(boxes, axis):
+    """
+    Boxes grouped by the empty gaps along axis (0 = x, 1 = y), in order,
+    and the width of each gap
+    """
+    ordered = sorted(boxes, key=lambda b: b[axis])
+    groups = [[ordered[0]]]
+    gaps = []
+    end = ordered[0][axis] + ordered[0][axis + 2]
+
+    for box in ordered[1:]:
+        if box[axis] > end:
+            gaps.append(box[axis] - end)
+            groups.append([box])
+        else:
+            groups[-1].append(box)
+        end = max(end, box[axis] + box[axis + 2])
+    return groups, gaps
+
+
+def _xy_cut(boxes, line_height, blocks):
+    columns, column_gaps = _split(boxes, 0)
+    rows, row_gaps = _split(boxes, 1)
+
+    if row_gaps and max(row_gaps) > BLOCK_GAP * line_height:
+        groups, gaps = rows, row_gaps
+    elif column_gaps and len(rows) > 1:
+        groups, gaps = columns, column_gaps
+    else:
+        # Fragments of one visual line (split by a wide word gap, or a
+        # "Name: ... Date: ..." row) are read as a single line
+        blocks.append([union(row) for row in rows])
+        return
+
+    cut = gaps.index(max(gaps)) + 1
+    for part in (groups[:cut], groups[cut:]):
+        _xy_cut([box for group in part for box in group], line_height, blocks)
+
+
+def find_lines(gray) -> list:
+    """
+    Text lines as (x, y, w, h) boxes, grouped by block: [[line, ...], ...]
+    with blocks and lines in reading order. Empty when no text is found.
+    """
+    binary = run_pipeline(gray, BINARIZE)
+    height = char_height(binary)
+    if not height:
+        return []
+
+    line_mask = run_pipeline(binary, (
+        ("dilate", {"kernel": (max(1, height // 4), max(1, int(height * LINE_GAP)))}),
+    ))
+    contours, _ = cv2.findContours(line_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    lines = [box for box in map(cv2.boundingRect, contours) if box[3] >= MIN_CHAR_HEIGHT]
+    if not lines:
+        return []
+
+    blocks = []
+    _xy_cut(lines, int(np.median([box[3] for box in lines])), blocks)
+    return blocks
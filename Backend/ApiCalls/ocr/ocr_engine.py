@@ -1,11 +1,22 @@
 # Backend/ApiCalls/ocr/ocr_engine.py
 
-from .preprocessors import *
-import easyocr
-import cv2
-import numpy as np
+import collections
+import os
+import threading
 
-EASY_OCR_CODES = {...}
+from .image_ingest import read_upload, decode_image, InvalidImage
+from .preprocess import *
+
+# EasyOCR has no recognition models for Malayalam, Gujarati, Punjabi or Odia,
+# so only the scripts below can be read with it.
+EASY_OCR_CODES = {
+    "Hindi": "hi",
+    "Marathi": "mr",
+    "Bengali": "bn",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Kannada": "kn"
+}
 
 PREPROCESS_MAP = {
     "Hindi": preprocess_devanagari,
@@ -20,19 +31,102 @@ PREPROCESS_MAP = {
     "Gujarati": preprocess_gujarati
 }
 
+# Each EasyOCR reader holds a few hundred MB of weights, so only this many
+# languages stay loaded per process; the least recently used one is dropped.
+MAX_RESIDENT_READERS = int(os.getenv("OCR_MAX_READERS", 3))
+
+
+class ReaderRegistry:
+    """
+    Long-lived EasyOCR readers keyed by language, loaded on first use
+    """
+
+    def __init__(self, max_resident=MAX_RESIDENT_READERS):
+        self.max_resident = max_resident
+        self._readers = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, language):
+        code = EASY_OCR_CODES.get(language)
+        if code is None:
+            return None
+
+        with self._lock:
+            reader = self._readers.get(code)
+            if reader is not None:
+                self._readers.move_to_end(code)
+                return reader
+            load_lock = self._loading.setdefault(code, threading.Lock())
+
+        # Load outside the registry lock so other languages are not blocked,
+        # while concurrent requests for this language wait for one load.
+        with load_lock:
+            with self._lock:
+                reader = self._readers.get(code)
+                if reader is not None:
+                    self._readers.move_to_end(code)
+                    return reader
+
+            reader = self._load(code)
+
+            with self._lock:
+                self._readers[code] = reader
+                while len(self._readers) > self.max_resident:
+                    evicted, _ = self._readers.popitem(last=False)
+                    print("Evicted OCR reader:", evicted)
+                self._loading.pop(code, None)
+
+        return reader
+
+    def prewarm(self, languages):
+        for language in languages:
+            if self.get(language) is None:
+                print("No EasyOCR model for", language)
+
+    def loaded(self):
+        with self._lock:
+            return list(self._readers)
+
+    @staticmethod
+    def _load(code):
+        import easyocr
+
+        return easyocr.Reader([code, "en"], gpu=False, verbose=False)
+
+
+readers = ReaderRegistry()
+
+
+def prewarm_from_env():
+    """
+    Loads the comma separated OCR_PREWARM_LANGUAGES, e.g. "Hindi,Tamil",
+    so the first request in a fresh worker does not pay for model loading.
+    """
+    languages = [
+        lang.strip()
+        for lang in os.getenv("OCR_PREWARM_LANGUAGES", "").split(",")
+        if lang.strip()
+    ]
+    readers.prewarm(languages)
+
+
 def ocr_extract_text(image_file, language):
-    img_bytes = image_file.read()
-    nparr = np.frombuffer(img_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    img_bytes = read_upload(image_file)
     image_file.seek(0)
 
-    if img is None:
+    try:
+        img = decode_image(img_bytes)
+    except InvalidImage:
+        return ""
+
+    reader = readers.get(language)
+    if reader is None:
         return ""
 
-    processor = PREPROCESS_MAP.get(language)
+    processor = PREPROCESS_MAP.get(language, preprocess_generic)
     processed = processor(img)
 
-    reader = easyocr.Reader([EASY_OCR_CODES[language]], gpu=False)
     result = reader.readtext(processed, detail=0)
 
     if not result:
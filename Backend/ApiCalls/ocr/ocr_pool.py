@@ -0,0 +1,167 @@
+# Backend/ApiCalls/ocr/ocr_pool.py
+'''
+Bounded process pool for CPU-heavy OCR.
+
+Keeps Tesseract/EasyOCR work off the gunicorn request threads. At most
+max_pending jobs may be queued or running; further submissions are rejected
+with OCRPoolFull so a burst of photo uploads cannot starve text-only
+requests. Worker processes are replaced after max_jobs_per_worker jobs to
+contain memory growth from OpenCV / model weights.
+'''
+import multiprocessing
+import os
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Every gunicorn worker runs its own pool, so the half of the cores given to
+# OCR is split between them. gunicorn.conf.py takes its worker count from
+# WEB_CONCURRENCY too; set that rather than passing -w.
+WEB_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", max(1, (os.cpu_count() or 2) // 2 // WEB_WORKERS)))
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", OCR_WORKERS * 4))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", 30))
+OCR_JOBS_PER_WORKER = int(os.getenv("OCR_JOBS_PER_WORKER", 200))
+
+
+class OCRPoolFull(RuntimeError):
+    pass
+
+
+class OCRTimeout(RuntimeError):
+    pass
+
+
+class OCRJobError(RuntimeError):
+    pass
+
+
+def _init_worker():
+    """
+    Runs once in each worker process. Several tesseract processes share the
+    worker's cores, so each is held to a single OpenMP thread rather than
+    starting one per core.
+    """
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _run_job(fn, args, kwargs):
+    """
+    Runs in the worker process. Library exceptions (e.g. pytesseract's) do
+    not always survive pickling, and an unpicklable error would mark the
+    whole pool as broken, so they are flattened here: timeouts (pytesseract
+    raises RuntimeError("Tesseract process timeout")) to OCRTimeout and
+    everything else to OCRJobError.
+    """
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        if _is_timeout(e):
+            raise OCRTimeout(f"{type(e).__name__}: {e}") from None
+        raise OCRJobError(f"{type(e).__name__}: {e}") from None
+
+
+def _is_timeout(error) -> bool:
+    if isinstance(error, (TimeoutError, subprocess.TimeoutExpired)):
+        return True
+    return isinstance(error, RuntimeError) and "timeout" in str(error).lower()
+
+
+class OCRWorkerPool:
+    def __init__(self, workers=OCR_WORKERS, max_pending=OCR_MAX_PENDING,
+                 timeout=OCR_TIMEOUT, max_jobs_per_worker=OCR_JOBS_PER_WORKER):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded gunicorn worker is not safe, and
+                # max_tasks_per_child requires a non-fork start method anyway
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    max_tasks_per_child=self.max_jobs_per_worker
+                )
+            return self._executor
+
+    def _reset(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues fn(*args, **kwargs) on the pool. fn must be importable at
+        module level. Raises OCRPoolFull when max_pending jobs are in flight.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise OCRPoolFull("OCR queue is full")
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_job, fn, args, kwargs)
+        except BrokenProcessPool:
+            self._reset(executor)
+            try:
+                future = self._get_executor().submit(_run_job, fn, args, kwargs)
+            except BaseException:
+                self._slots.release()
+                raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self.submitted += 1
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Submits a job and waits for its result, raising OCRTimeout after
+        timeout seconds (defaults to the pool timeout).
+        """
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self.timed_out += 1
+            raise OCRTimeout("OCR job timed out")
+        except OCRTimeout:
+            # Tesseract gave up inside the worker
+            self.timed_out += 1
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+ocr_pool = OCRWorkerPool()
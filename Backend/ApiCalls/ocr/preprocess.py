@@ -3,112 +3,275 @@ import numpy as np
 
 
 # ==========================================
-# 1. Tamil — needs sharpening & Otsu threshold
+# Stages
 # ==========================================
-def preprocess_tamil(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (3, 3), 0)
-    sharp = cv2.addWeighted(gray, 2.5, blur, -1.5, 0)
-    _, bw = cv2.threshold(sharp, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    return bw
+# Each per-script filter is a short list of (stage, params) pairs run over a
+# grayscale image. Stages write into caller-supplied buffers (OpenCV dst=)
+# so a batch of same-sized images or page crops reuses one workspace instead
+# of allocating fresh arrays at every step.
+
+KERNELS = {
+    (2, 2): np.ones((2, 2), np.uint8),
+    (1, 50): np.ones((1, 50), np.uint8),
+}
+
+
+def _kernel(shape):
+    kernel = KERNELS.get(shape)
+    if kernel is None:
+        kernel = KERNELS[shape] = np.ones(shape, np.uint8)
+    return kernel
+
+
+def _gaussian_blur(src, dst, ws, ksize):
+    return cv2.GaussianBlur(src, (ksize, ksize), 0, dst=dst)
+
+
+def _median_blur(src, dst, ws, ksize):
+    return cv2.medianBlur(src, ksize, dst=dst)
+
+
+def _bilateral(src, dst, ws, d, sigma_color, sigma_space):
+    return cv2.bilateralFilter(src, d, sigma_color, sigma_space, dst=dst)
+
+
+def _unsharp(src, dst, ws, ksize, amount):
+    blur = cv2.GaussianBlur(src, (ksize, ksize), 0, dst=ws.scratch)
+    return cv2.addWeighted(src, 1 + amount, blur, -amount, 0, dst=dst)
+
+
+def _threshold(src, dst, ws, value=0, otsu=False):
+    flags = cv2.THRESH_BINARY_INV + (cv2.THRESH_OTSU if otsu else 0)
+    _, out = cv2.threshold(src, value, 255, flags, dst=dst)
+    return out
+
+
+def _adaptive_threshold(src, dst, ws, block, c):
+    return cv2.adaptiveThreshold(
+        src, 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY_INV, block, c,
+        dst=dst
+    )
+
+
+def _dilate(src, dst, ws, kernel, iterations=1):
+    return cv2.dilate(src, _kernel(kernel), dst=dst, iterations=iterations)
+
+
+def _open(src, dst, ws, kernel):
+    return cv2.morphologyEx(src, cv2.MORPH_OPEN, _kernel(kernel), dst=dst)
+
+
+STAGES = {
+    "gaussian_blur": _gaussian_blur,
+    "median_blur": _median_blur,
+    "bilateral": _bilateral,
+    "unsharp": _unsharp,
+    "threshold": _threshold,
+    "adaptive_threshold": _adaptive_threshold,
+    "dilate": _dilate,
+    "open": _open,
+}
 
 
 # ==========================================
-# 2. Malayalam — smooth + threshold + dilation (VERY important)
+# Per-script specs
 # ==========================================
-def preprocess_malayalam(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blur = cv2.medianBlur(gray, 3)
-    _, bw = cv2.threshold(blur, 150, 255, cv2.THRESH_BINARY_INV)
-    kernel = np.ones((2, 2), np.uint8)
-    thick = cv2.dilate(bw, kernel, iterations=1)
-    return thick
+PIPELINES = {
+    # Tamil — needs sharpening & Otsu threshold
+    "tamil": (
+        ("unsharp", {"ksize": 3, "amount": 1.5}),
+        ("threshold", {"otsu": True}),
+    ),
+    # Malayalam — smooth + threshold + dilation (VERY important)
+    "malayalam": (
+        ("median_blur", {"ksize": 3}),
+        ("threshold", {"value": 150}),
+        ("dilate", {"kernel": (2, 2)}),
+    ),
+    # Kannada — morphological open
+    "kannada": (
+        ("threshold", {"otsu": True}),
+        ("open", {"kernel": (2, 2)}),
+    ),
+    # Telugu — adaptive + dilation
+    "telugu": (
+        ("gaussian_blur", {"ksize": 5}),
+        ("adaptive_threshold", {"block": 31, "c": 10}),
+        ("dilate", {"kernel": (2, 2)}),
+    ),
+    # Bengali — bilateral filter + Otsu
+    "bengali": (
+        ("bilateral", {"d": 5, "sigma_color": 50, "sigma_space": 50}),
+        ("threshold", {"otsu": True}),
+    ),
+    # Odia — smooth + fixed threshold
+    "odia": (
+        ("median_blur", {"ksize": 5}),
+        ("threshold", {"value": 120}),
+    ),
+    # Gujarati — simple Otsu threshold
+    "gujarati": (
+        ("threshold", {"otsu": True}),
+    ),
+    # Punjabi (Gurmukhi) — high threshold
+    "punjabi": (
+        ("threshold", {"value": 180}),
+    ),
+    # Hindi / Marathi (Devanagari) — remove shirorekha (top line)
+    "devanagari": (
+        ("gaussian_blur", {"ksize": 5}),
+        ("threshold", {"otsu": True}),
+        ("open", {"kernel": (1, 50)}),
+    ),
+    # Fallback — simple grayscale threshold
+    "generic": (
+        ("threshold", {"otsu": True}),
+    ),
+}
+
+SCRIPT_FOR_LANGUAGE = {
+    "Hindi": "devanagari",
+    "Marathi": "devanagari",
+    "Tamil": "tamil",
+    "Malayalam": "malayalam",
+    "Kannada": "kannada",
+    "Telugu": "telugu",
+    "Bengali": "bengali",
+    "Odia": "odia",
+    "Punjabi": "punjabi",
+    "Gujarati": "gujarati"
+}
 
 
 # ==========================================
-# 3. Kannada — morphological open
+# Pipeline runner
 # ==========================================
-def preprocess_kannada(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    kernel = np.ones((2, 2), np.uint8)
-    opened = cv2.morphologyEx(bw, cv2.MORPH_OPEN, kernel)
-    return opened
+class Workspace:
+    """
+    Reusable grayscale + ping-pong buffers for one image shape
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.gray = np.empty(shape, np.uint8)
+        self.ping = np.empty(shape, np.uint8)
+        self.pong = np.empty(shape, np.uint8)
+        self.scratch = np.empty(shape, np.uint8)
+
+    def fits(self, shape):
+        return self.shape == shape
+
+
+def to_gray(img, dst=None):
+    """
+    Grayscale view of img; already-gray crops are passed through untouched
+    """
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY, dst=dst)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=dst)
+
+
+def run_pipeline(img, spec, out=None, workspace=None):
+    """
+    Runs the stages in spec over img (BGR or grayscale). The final stage
+    writes into out when given, so callers can fill a preallocated array.
+    """
+    shape = img.shape[:2]
+    if workspace is None or not workspace.fits(shape):
+        workspace = Workspace(shape)
+
+    src = to_gray(img, dst=workspace.gray)
+    buffers = (workspace.ping, workspace.pong)
+
+    for i, (name, params) in enumerate(spec):
+        last = i == len(spec) - 1
+        dst = out if last and out is not None else buffers[i % 2]
+        src = STAGES[name](src, dst, workspace, **params)
+
+    if out is None:
+        # Never hand out a workspace buffer; the next image would overwrite it
+        return src.copy()
+    return out
+
+
+def preprocess_batch(images, script="generic"):
+    """
+    Preprocesses many images or page crops with one script's pipeline.
+
+    Same-sized inputs share a single workspace and are written into one
+    preallocated (N, H, W) array; mixed sizes come back as a list.
+    """
+    spec = PIPELINES.get(script, PIPELINES["generic"])
+    images = list(images)
+    if not images:
+        return []
+
+    shapes = {img.shape[:2] for img in images}
+    if len(shapes) == 1:
+        shape = shapes.pop()
+        workspace = Workspace(shape)
+        out = np.empty((len(images), *shape), np.uint8)
+        for i, img in enumerate(images):
+            run_pipeline(img, spec, out=out[i], workspace=workspace)
+        return out
+
+    workspaces = {}
+    results = []
+    for img in images:
+        shape = img.shape[:2]
+        workspace = workspaces.get(shape)
+        if workspace is None:
+            workspace = workspaces[shape] = Workspace(shape)
+        results.append(run_pipeline(img, spec, workspace=workspace))
+    return results
+
+
+def preprocess_for_language(img, language):
+    return run_pipeline(img, PIPELINES[SCRIPT_FOR_LANGUAGE.get(language, "generic")])
 
 
 # ==========================================
-# 4. Telugu — adaptive + dilation
+# Per-script entry points
 # ==========================================
+def preprocess_tamil(img):
+    return run_pipeline(img, PIPELINES["tamil"])
+
+
+def preprocess_malayalam(img):
+    return run_pipeline(img, PIPELINES["malayalam"])
+
+
+def preprocess_kannada(img):
+    return run_pipeline(img, PIPELINES["kannada"])
+
+
 def preprocess_telugu(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    adapt = cv2.adaptiveThreshold(
-        blur, 255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY_INV, 31, 10
-    )
-    kern = np.ones((2, 2), np.uint8)
-    dil = cv2.dilate(adapt, kern, iterations=1)
-    return dil
+    return run_pipeline(img, PIPELINES["telugu"])
 
 
-# ==========================================
-# 5. Bengali — bilateral filter + Otsu
-# ==========================================
 def preprocess_bengali(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blur = cv2.bilateralFilter(gray, 5, 50, 50)
-    _, bw = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    return bw
+    return run_pipeline(img, PIPELINES["bengali"])
 
 
-# ==========================================
-# 6. Odia — smooth + fixed threshold
-# ==========================================
 def preprocess_odia(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blur = cv2.medianBlur(gray, 5)
-    _, bw = cv2.threshold(blur, 120, 255, cv2.THRESH_BINARY_INV)
-    return bw
+    return run_pipeline(img, PIPELINES["odia"])
 
 
-# ==========================================
-# 7. Gujarati — simple Otsu threshold
-# ==========================================
 def preprocess_gujarati(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    return bw
+    return run_pipeline(img, PIPELINES["gujarati"])
 
 
-# ==========================================
-# 8. Punjabi (Gurmukhi) — high threshold
-# ==========================================
 def preprocess_punjabi(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, bw = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
-    return bw
+    return run_pipeline(img, PIPELINES["punjabi"])
 
 
-# ==========================================
-# 9. Hindi / Marathi (Devanagari) — remove shirorekha
-# ==========================================
 def preprocess_devanagari(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    _, bw = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return run_pipeline(img, PIPELINES["devanagari"])
 
-    # Remove top line (shirorekha)
-    kernel = np.ones((1, 50), np.uint8)
-    removed = cv2.morphologyEx(bw, cv2.MORPH_OPEN, kernel)
 
-    return removed
-
-
-# ==========================================
-# 10. Fallback — simple grayscale threshold
-# ==========================================
 def preprocess_generic(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    return bw
+    return run_pipeline(img, PIPELINES["generic"])
@@ -0,0 +1,160 @@
+# Backend/ApiCalls/ocr/tesseract_ocr.py
+'''
+Tesseract OCR split across cores.
+
+The page is segmented into text lines (see layout.py); the lines are cut
+into crops that are recognised concurrently, each by its own tesseract
+process, and the text is reassembled in reading order. Native-script
+traineddata (hin, tam, mal, ...) is used for the learner's language when it
+is installed, alongside eng for any Latin text on the page.
+'''
+import functools
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .image_ingest import decode_image, InvalidImage
+from .ocr_pool import OCR_WORKERS, WEB_WORKERS
+
+
+# Tesseract traineddata per /learn language
+TESSERACT_LANGS = {
+    "Hindi": "hin",
+    "Marathi": "mar",
+    "Bengali": "ben",
+    "Tamil": "tam",
+    "Telugu": "tel",
+    "Gujarati": "guj",
+    "Kannada": "kan",
+    "Malayalam": "mal",
+    "Punjabi": "pan",
+    "Odia": "ori"
+}
+
+# Concurrent tesseract processes per OCR job. Up to OCR_WORKERS jobs run at
+# once in each of the WEB_WORKERS gunicorn workers, so each job gets its
+# share of the cores; the pool's initializer holds every tesseract to one
+# OpenMP thread.
+OCR_LINE_THREADS = int(os.getenv(
+    "OCR_LINE_THREADS", max(1, (os.cpu_count() or 1) // (OCR_WORKERS * WEB_WORKERS))
+))
+
+# Aim for about this many crops per thread: enough to balance uneven lines,
+# few enough that tesseract start-up does not dominate
+CROPS_PER_THREAD = 2
+
+# Pixels of margin kept around each crop so ascenders and matras survive
+CROP_PAD = 4
+
+PSM_BLOCK = "--psm 6"
+PSM_LINE = "--psm 7"
+
+
+@functools.lru_cache(maxsize=1)
+def installed_languages() -> frozenset:
+    import pytesseract
+
+    try:
+        return frozenset(pytesseract.get_languages(config=""))
+    except Exception as e:
+        print("Could not list Tesseract languages:", e)
+        return frozenset()
+
+
+def tesseract_lang(language) -> str:
+    """
+    "-l" argument for a /learn language: its script plus English when that
+    traineddata is installed, otherwise English alone
+    """
+    code = TESSERACT_LANGS.get(language)
+    if code is None:
+        return "eng"
+
+    installed = installed_languages()
+    if code not in installed:
+        print(f"Tesseract '{code}' traineddata not installed; reading {language} as English")
+        return "eng"
+    return f"{code}+eng" if "eng" in installed else code
+
+
+def _crops(blocks, threads):
+    """
+    [(block index, box, psm)]: each block's lines in runs of consecutive
+    lines, sized so there are about CROPS_PER_THREAD crops per thread
+    """
+    total = sum(len(lines) for lines in blocks)
+    per_crop = max(1, math.ceil(total / (threads * CROPS_PER_THREAD)))
+
+    crops = []
+    for index, lines in enumerate(blocks):
+        for start in range(0, len(lines), per_crop):
+            run = lines[start:start + per_crop]
+            x0 = min(x for x, _, _, _ in run)
+            y0 = min(y for _, y, _, _ in run)
+            x1 = max(x + w for x, _, w, _ in run)
+            y1 = max(y + h for _, y, _, h in run)
+            psm = PSM_LINE if len(run) == 1 else PSM_BLOCK
+            crops.append((index, (x0, y0, x1, y1), psm))
+    return crops
+
+
+def extract_text_from_image(image_bytes: bytes, timeout: float = 0, language=None) -> str:
+    """
+    OCR using Tesseract (no torch)
+
+    image_bytes is the encoded upload; it is decoded (and downscaled) in
+    memory. language picks the traineddata (English when None). timeout
+    (seconds, 0 = none) bounds the whole page: each tesseract process gets
+    whatever is left and pytesseract kills it when that runs out.
+    """
+    # Imported here: this runs in the OCR pool's worker processes, and the
+    # web workers that only queue jobs never need OpenCV or pytesseract
+    import pytesseract
+
+    from .layout import find_lines
+    from .preprocess import to_gray
+
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def remaining():
+        if deadline is None:
+            return 0
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise RuntimeError("Tesseract process timeout")
+        return left
+
+    try:
+        img = decode_image(image_bytes)
+    except InvalidImage:
+        return ""
+
+    gray = to_gray(img)
+    lang = tesseract_lang(language)
+
+    def read(box, psm):
+        x0, y0, x1, y1 = box
+        crop = gray[
+            max(0, y0 - CROP_PAD): min(gray.shape[0], y1 + CROP_PAD),
+            max(0, x0 - CROP_PAD): min(gray.shape[1], x1 + CROP_PAD)
+        ]
+        return pytesseract.image_to_string(crop, lang=lang, config=psm, timeout=remaining()).strip()
+
+    blocks = find_lines(gray)
+    if not blocks:
+        return read((0, 0, gray.shape[1], gray.shape[0]), PSM_BLOCK)
+
+    crops = _crops(blocks, OCR_LINE_THREADS)
+    if len(crops) == 1:
+        texts = [read(crops[0][1], crops[0][2])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(OCR_LINE_THREADS, len(crops))) as pool:
+            texts = list(pool.map(lambda crop: read(crop[1], crop[2]), crops))
+
+    paragraphs = [[] for _ in blocks]
+    for (index, _, _), text in zip(crops, texts):
+        if text:
+            paragraphs[index].append(text)
+
+    return "\n".join("\n".join(lines) for lines in paragraphs if lines).strip()
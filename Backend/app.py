@@ -1,20 +1,61 @@
-from flask import Flask, render_template, request, redirect, send_from_directory
+import time
+
+# Start of the startup report's clock (see create_app)
+BOOT_STARTED = time.time()
+
+from flask import Flask, Response, g, render_template, request, redirect, send_from_directory, jsonify, url_for
 import re
-import requests
 import os
+import json
+import importlib
+import contextlib
+import threading
 import pathlib
 import tempfile
 import base64
-
-from rapidfuzz import fuzz
-from sarvamai import SarvamAI
-from sarvamai.play import save
-
-from Backend.ApiCalls.helpers.text_to_speech import tts
-from Backend.ApiCalls.helpers.phonetic_help import phonetic_help
-
-import pytesseract
-import cv2
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# The Sarvam SDK, numpy (audio_prep), the phoneme tables (scoring) and the
+# OpenCV / Tesseract stack are imported where they are first used, or by
+# preload() in the gunicorn master, not at module import.
+from Backend import metrics
+from Backend.ApiCalls import clients as api_clients
+from Backend.ApiCalls.clients import LazySarvamClient
+from Backend.ApiCalls.helpers.speech_to_text import stt_bytes, stt_stream, STREAM_SAMPLE_RATE
+from Backend.ApiCalls.helpers.text_to_speech import tts, tts_stream, VOICE as TTS_VOICE
+from Backend.ApiCalls.helpers.phonetic_help import (
+    phonetic_help,
+    batcher as phonetic_batcher,
+    PROMPT_VERSION as PHONETIC_PROMPT_VERSION,
+    MODEL_PARAMS as PHONETIC_MODEL_PARAMS
+)
+from Backend.cache.audio import AudioCache, cache_key as audio_cache_key
+from Backend.cache.phonetic import PhoneticHelpStore
+from Backend.cache.shared import SharedCache, SingleFlight
+from Backend.cache.transcripts import TranscriptStore
+from Backend.history import (
+    HistoryStore,
+    LEARNER_COOKIE,
+    LEARNER_COOKIE_MAX_AGE,
+    new_learner_id,
+    valid_learner_id
+)
+from Backend.jobs import JobQueue, JobQueueFull
+from Backend.pronunciation_pack import PronunciationPack, PACK_PATH
+from Backend.static_assets import StaticAssets
+from Backend import transliteration
+from Backend.transliteration import GOOGLE_LANG_MAP, transliterate_to_native, memo_stats as transliteration_memo_stats
+from Backend.audio_stream import (
+    COMPRESSED_FORMATS,
+    MIMETYPES as AUDIO_MIMETYPES,
+    can_transcode,
+    transcode_writer,
+    tee_to_cache
+)
+from Backend.ApiCalls.ocr.ocr_pool import ocr_pool, OCRPoolFull, OCRTimeout, OCRJobError
+from Backend.ApiCalls.ocr.tesseract_ocr import extract_text_from_image
+from Backend.ApiCalls.ocr.image_ingest import read_upload, check_image, ImageTooLarge, InvalidImage
 
 
 
@@ -26,9 +67,68 @@ PROJECT_ROOT = BASE_DIR.parent
 
 TEMPLATES_DIR = PROJECT_ROOT / "Frontend" / "Templates"
 STATIC_DIR = PROJECT_ROOT / "Frontend" / "Static"
+STATIC_BUILD_DIR = STATIC_DIR / "build"
 
 AUDIO_OUTPUT_DIR = pathlib.Path("/tmp/correct_pronunciation_output")
 
+CACHE_DIR = pathlib.Path(os.getenv("UCHAARAN_CACHE_DIR", "/tmp/uchaaran_cache"))
+
+# Audio files are content addressed, so browsers may keep them indefinitely
+AUDIO_MAX_AGE = 365 * 24 * 3600
+# Same for fingerprinted static assets (see static_assets.py)
+STATIC_MAX_AGE = 365 * 24 * 3600
+# create_app() rebuilds the fingerprinted assets when a source file changed
+STATIC_REBUILD = os.getenv("STATIC_REBUILD", "1") == "1"
+
+# When set, /learn does not wait for TTS on a cache miss; the page points the
+# player at /audio/stream which relays Sarvam's streaming TTS as it arrives.
+STREAM_TTS = os.getenv("STREAM_TTS", "0") == "1"
+
+# One lock directory for every cache, so a miss is computed by a single
+# worker while concurrent requests for it in other workers wait
+single_flight = SingleFlight(CACHE_DIR / "locks")
+
+audio_cache = AudioCache(AUDIO_OUTPUT_DIR, flights=single_flight)
+phonetic_store = PhoneticHelpStore(
+    CACHE_DIR / "phonetic_help.sqlite3",
+    prompt_version=PHONETIC_PROMPT_VERSION,
+    model_params=PHONETIC_MODEL_PARAMS,
+    flights=single_flight
+)
+transliteration_cache = SharedCache(
+    CACHE_DIR / "shared.sqlite3",
+    "transliteration",
+    flights=single_flight
+)
+transliteration.use_shared_cache(transliteration_cache)
+transcript_store = TranscriptStore(CACHE_DIR / "transcripts.sqlite3")
+
+# Curated words precomputed offline (python -m Backend.pronunciation_pack);
+# memory-mapped so they are answered without any API call
+pronunciation_pack = PronunciationPack(PACK_PATH, TTS_VOICE, PHONETIC_PROMPT_VERSION)
+pronunciation_pack.load()
+
+# Every /check attempt with per-word aggregates for /history. Not a cache:
+# point HISTORY_DB at persistent storage in production.
+history_store = HistoryStore(os.getenv("HISTORY_DB", CACHE_DIR / "history.sqlite3"))
+
+# Fingerprinted, precompressed copies of Frontend/Static, served from /assets
+static_assets = StaticAssets(STATIC_DIR, STATIC_BUILD_DIR)
+static_assets.load(rebuild=False)
+
+# Asynchronous /api/learn/jobs: state is shared through SQLite so any worker
+# can answer a poll or an SSE stream for a job another worker is running
+job_queue = JobQueue(CACHE_DIR / "jobs.sqlite3")
+
+# SSE: the keep-alive comment interval and the longest a stream stays open.
+# Each open stream holds a request thread, so a worker serves at most
+# JOB_MAX_STREAMS of them (half its gthread threads by default); past that
+# clients are told to poll the status URL instead.
+JOB_HEARTBEAT = 15
+JOB_STREAM_TIMEOUT = 120
+JOB_MAX_STREAMS = int(os.getenv("JOB_MAX_STREAMS", max(1, int(os.getenv("GUNICORN_THREADS", 8)) // 2)))
+job_stream_slots = threading.BoundedSemaphore(JOB_MAX_STREAMS)
+
 # --------------------------------------------------
 # FLASK APP
 # --------------------------------------------------
@@ -40,32 +140,103 @@ app = Flask(
 
 app.config["ENV"] = "production"
 app.config["DEBUG"] = False
+# Hard cap on any request body; image uploads have their own tighter limit
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_CONTENT_LENGTH", 25 * 1024 * 1024))
+
+# Websocket routes need flask-sock; without it /check only offers the
+# record-then-upload flow.
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+sock = Sock(app) if Sock else None
+
+
+def asset_url(filename: str, variant: str = None):
+    """
+    URL of a static file for templates: its fingerprinted copy under /assets
+    when built, else the plain /static file. variant="webp" gives the WebP
+    copy of an image, or None when there is none.
+    """
+    built = static_assets.lookup(filename, variant)
+    if built:
+        return url_for("serve_asset", filename=built)
+    return None if variant else url_for("static", filename=filename)
+
+
+app.jinja_env.globals["asset_url"] = asset_url
+
+
+def current_learner(create: bool = False):
+    """
+    Learner id from the cookie. With create, a learner without one gets a
+    new id, set as a cookie on this response.
+    """
+    learner = request.cookies.get(LEARNER_COOKIE)
+    if valid_learner_id(learner):
+        return learner
+    if not create:
+        return None
+
+    g.new_learner = new_learner_id()
+    return g.new_learner
+
+
+@app.after_request
+def _set_learner_cookie(response):
+    learner = g.pop("new_learner", None)
+    if learner is not None:
+        response.set_cookie(
+            LEARNER_COOKIE,
+            learner,
+            max_age=LEARNER_COOKIE_MAX_AGE,
+            httponly=True,
+            samesite="Lax",
+            secure=request.is_secure
+        )
+    return response
+
+# /check/stream: how long to wait for the next chunk before giving up, and
+# the longest recording accepted (16-bit mono PCM)
+STREAM_CHECK_IDLE = float(os.getenv("STREAM_CHECK_IDLE", 10))
+STREAM_CHECK_MAX_SECONDS = 30
+STREAM_CHECK_MAX_BYTES = STREAM_CHECK_MAX_SECONDS * STREAM_SAMPLE_RATE * 2
 
 # --------------------------------------------------
 # ENV + SARVAM CLIENT
 # --------------------------------------------------
-SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
-if not SARVAM_API_KEY:
-    raise RuntimeError("SARVAM_API_KEY not set")
+# Shared, connection-pooled client, created on the first API call; a missing
+# SARVAM_API_KEY fails those calls and is flagged in the startup report
+client = LazySarvamClient()
+
+# --------------------------------------------------
+# LEARN FAN-OUT
+# --------------------------------------------------
+# Phonetic help and TTS are independent remote calls, so each /learn request
+# runs them side by side on this shared pool instead of back to back.
+LEARN_WORKERS = int(os.getenv("LEARN_WORKERS", 8))
+PHONETIC_TIMEOUT = float(os.getenv("PHONETIC_TIMEOUT", 20))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", 30))
+
+learn_executor = ThreadPoolExecutor(
+    max_workers=LEARN_WORKERS,
+    thread_name_prefix="learn"
+)
 
-client = SarvamAI(api_subscription_key=SARVAM_API_KEY)
+# Bulk /api/learn/batch: how many uncached words are processed at once (each
+# one fans out to phonetic help + TTS on learn_executor) and the list cap.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 200))
+
+batch_executor = ThreadPoolExecutor(
+    max_workers=BATCH_CONCURRENCY,
+    thread_name_prefix="learn-batch"
+)
 
 # --------------------------------------------------
 # LANGUAGE MAPS
 # --------------------------------------------------
-GOOGLE_LANG_MAP = {
-    "Hindi": "hi",
-    "Bengali": "bn",
-    "Tamil": "ta",
-    "Telugu": "te",
-    "Gujarati": "gu",
-    "Kannada": "kn",
-    "Malayalam": "ml",
-    "Marathi": "mr",
-    "Punjabi": "pa",
-    "Odia": "or"
-}
-
 SARVAM_LANG_MAP = {
     "Hindi": "hi-IN",
     "Bengali": "bn-IN",
@@ -104,34 +275,6 @@ WORD_LANGUAGE_MAP = {
 # --------------------------------------------------
 # HELPERS
 # --------------------------------------------------
-def is_english(text: str) -> bool:
-    return bool(re.fullmatch(r"[A-Za-z\s]+", text))
-
-
-def transliterate_to_native(text: str, language: str) -> str:
-    lang_code = GOOGLE_LANG_MAP.get(language)
-    if not lang_code or not is_english(text):
-        return text
-
-    try:
-        response = requests.get(
-            "https://inputtools.google.com/request",
-            params={
-                "text": text,
-                "itc": f"{lang_code}-t-i0-und",
-                "num": 1
-            },
-            timeout=5
-        ).json()
-
-        if response[0] == "SUCCESS":
-            return response[1][0][1][0]
-    except Exception as e:
-        print("Transliteration error:", e)
-
-    return text
-
-
 def clean_and_format(text: str) -> str:
     text = re.sub(r"\*\*", "", text)
     text = re.sub(r"#+\s*", "", text)
@@ -150,77 +293,397 @@ def save_base64_audio(data_url: str) -> str:
     return tmp.name
 
 
+@metrics.timed("transcribe_audio")
 def transcribe_audio(audio_path: str, language: str) -> str:
-    """
-    ✅ CORRECT Sarvam Speech-to-Text usage
-    """
+    from Backend import audio_prep
+
     lang_code = SARVAM_LANG_MAP.get(language, "en-IN")
 
-    response = client.speech_to_text.transcribe(
-        audio_path=audio_path,
-        language_code=lang_code
-    )
+    with open(audio_path, "rb") as f:
+        data = f.read()
 
-    if isinstance(response, dict):
-        text = response.get("text", "")
-    else:
-        text = getattr(response, "text", "")
+    samples = audio_prep.normalize(data)
+    if samples is None:
+        # normalize() already failed to decode it; send it untouched
+        text = stt_bytes(client, data, os.path.basename(audio_path), lang_code, prepare=False)
+        return (text or "").strip().lower()
+
+    # Resubmitted recordings and our own reference audio are served from the
+    # shared transcript cache instead of another STT call
+    audio = audio_prep.encode_wav(samples)
+    upload = audio if audio_prep.ENABLED else data
+
+    text = transcript_store.get_or_transcribe(
+        audio,
+        audio_prep.fingerprint(samples),
+        lang_code,
+        lambda: stt_bytes(client, upload, "audio.wav", lang_code, prepare=False)
+    ) or ""
 
     return text.strip().lower()
 
 
-def score_pronunciation(expected: str, spoken: str) -> float:
-    similarity = fuzz.ratio(expected, spoken)
-    return round((similarity / 100) * 10, 1)
+def seed_transcript(path, text: str, language: str):
+    """
+    Records the known text of audio we synthesised so a learner checking
+    themselves against it never costs an STT call
+    """
+    try:
+        seed_transcript_audio(pathlib.Path(path).read_bytes(), text, language)
+    except OSError as e:
+        print("Transcript seeding error:", e)
+
+
+def seed_transcript_audio(data: bytes, text: str, language: str) -> bool:
+    from Backend import audio_prep
+
+    try:
+        samples = audio_prep.normalize(data)
+        if samples is None:
+            return False
+        transcript_store.put(
+            audio_prep.encode_wav(samples),
+            audio_prep.fingerprint(samples),
+            SARVAM_LANG_MAP[language],
+            text,
+            source="tts"
+        )
+    except Exception as e:
+        print("Transcript seeding error:", e)
+        return False
+    return True
+
+
+# One marker per pack build, kept no longer than the transcripts it stands
+# for, so the pack's reference audio is seeded once per box and again after
+# those rows have expired
+pack_transcripts_seeded = SharedCache(
+    CACHE_DIR / "shared.sqlite3",
+    "pack_transcripts",
+    ttl=transcript_store.ttl,
+    flights=single_flight
+)
+_pack_seeding_started = False
 
 
-def extract_text_from_image(image_path: str) -> str:
+def seed_pack_transcripts() -> int:
     """
-    English OCR using Tesseract (no torch)
+    Seeds the transcript store with the reference audio of every pack entry,
+    as synthesize_audio does for audio it makes itself. The first worker to
+    get here does the work; the others wait for it and find the marker.
+    Returns the number of clips seeded for the current pack.
     """
-    img = cv2.imread(image_path)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if not pronunciation_pack.loaded:
+        return 0
 
-    text = pytesseract.image_to_string(
-        gray,
-        lang="eng",
-        config="--psm 6"
-    )
+    def seed():
+        seeded = sum(
+            seed_transcript_audio(bytes(audio), text, language)
+            for text, language, audio in pronunciation_pack.references()
+        )
+        print(f"Seeded {seeded} pronunciation pack transcripts")
+        return str(seeded)
 
-    return text.strip()
+    try:
+        return int(pack_transcripts_seeded.get_or_compute(str(pronunciation_pack.built_at), seed))
+    except Exception as e:
+        print("Pack transcript seeding error:", e)
+        return 0
+
+
+@app.before_request
+def _start_pack_seeding():
+    # Seeding opens SQLite, so it cannot run in preload() before the fork;
+    # each worker starts it in the background on its first request instead
+    global _pack_seeding_started
+    if _pack_seeding_started:
+        return
+    _pack_seeding_started = True
+    threading.Thread(target=seed_pack_transcripts, name="pack-transcripts", daemon=True).start()
 
 
 # --------------------------------------------------
 # CORE PROCESSING
 # --------------------------------------------------
-def process_learn(language: str, text_input: str) -> dict:
-    AUDIO_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    safe_text = re.sub(r"[^\w\-]", "_", text_input.strip())
-    filename = f"{safe_text}_{language}.wav"
-    file_path = AUDIO_OUTPUT_DIR / filename
-
-    how_to_say = phonetic_help(client, text_input)
-    how_to_say = clean_and_format(how_to_say)
+def synthesize_audio(text: str, language: str) -> str:
+    """
+    Returns the cached wav filename for text, calling Sarvam TTS on a miss
+    unless /audio/stream already cached the word in another encoding
+    """
+    packed = pronunciation_pack.lookup(text, language)
+    if packed:
+        return packed["pronunciation_audio"]
+
+    key = audio_cache_key(text, language, TTS_VOICE)
+
+    def write_audio(path):
+        from sarvamai.play import save
+
+        if can_transcode():
+            for ext in COMPRESSED_FORMATS:
+                if not audio_cache.contains(key, ext):
+                    continue
+                try:
+                    transcode_writer(audio_cache.path_for(key, ext), "wav")(path)
+                except Exception as e:
+                    print("Transcode error:", e)
+                    continue
+                seed_transcript(path, text, language)
+                return
 
-    if not file_path.exists():
         pronunciation_audio = tts(
             client,
-            text=text_input,
+            text=text,
             lang_code=GOOGLE_LANG_MAP[language] + "-IN"
         )
-        save(pronunciation_audio, str(file_path))
+        save(pronunciation_audio, path)
+        seed_transcript(path, text, language)
+
+    return audio_cache.get_or_create(text, language, TTS_VOICE, write_audio)
+
+
+def explain_pronunciation(text: str, language: str) -> str:
+    """
+    Phonetic explanation for text, served from the pack or the shared store
+    when cached
+    """
+    packed = pronunciation_pack.lookup(text, language)
+    if packed:
+        return packed["how_to_say"]
+
+    how_to_say = phonetic_store.get_or_compute(
+        text,
+        language,
+        lambda: phonetic_help(client, text)
+    )
+    return clean_and_format(how_to_say)
+
+
+def _collect(future, timeout: float, label: str, errors: list):
+    """
+    Waits for a fan-out call, turning failures into a partial result
+    """
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        errors.append(f"{label} timed out")
+    except Exception as e:
+        print(f"{label} error:", e)
+        errors.append(f"{label} failed")
+    return None
+
+
+def cached_audio_filename(text: str, language: str):
+    """
+    Filename of any cached encoding of text's audio, or None
+    """
+    if pronunciation_pack.contains(text, language):
+        return pronunciation_pack.lookup(text, language)["pronunciation_audio"]
+
+    key = audio_cache_key(text, language, TTS_VOICE)
+    for ext in ("wav", "mp3"):
+        if audio_cache.contains(key, ext):
+            return audio_cache.filename_for(key, ext)
+    return None
+
+
+def _report(future, on_stage, stage, field):
+    """
+    Calls on_stage(stage, {field: result}) as soon as future succeeds
+    """
+    def done(f):
+        if not f.cancelled() and f.exception() is None:
+            on_stage(stage, {field: f.result()})
+
+    future.add_done_callback(done)
+
+
+def process_learn(language: str, text_input: str, stream_audio: bool = False, on_stage=None) -> dict:
+    """
+    Transliterates text_input, then fetches the phonetic explanation and the
+    audio concurrently. Either half may be missing if its call fails or
+    exceeds its timeout; the reasons are listed under "errors".
+
+    With stream_audio, uncached audio is not synthesised here; the result
+    has "audio_stream" set and the client fetches /audio/stream instead.
+
+    on_stage(stage, data), if given, hears about "text", "how_to_say" and
+    "audio" the moment each is ready rather than when all are.
+    """
+    text = pronunciation_pack.native(text_input, language) or transliterate_to_native(text_input, language)
+    if on_stage:
+        on_stage("text", {"language": language, "text": text})
+
+    phonetic_future = learn_executor.submit(explain_pronunciation, text, language)
+    if on_stage:
+        _report(phonetic_future, on_stage, "how_to_say", "how_to_say")
+
+    audio_future = None
+    filename = cached_audio_filename(text, language) if stream_audio else None
+    if not stream_audio:
+        audio_future = learn_executor.submit(synthesize_audio, text, language)
+        if on_stage:
+            _report(audio_future, on_stage, "audio", "pronunciation_audio")
+
+    errors = []
+    how_to_say = _collect(phonetic_future, PHONETIC_TIMEOUT, "Phonetic help", errors)
+    if audio_future is not None:
+        filename = _collect(audio_future, TTS_TIMEOUT, "Audio", errors)
 
     return {
         "language": language,
-        "text": text_input,
+        "text": text,
         "pronunciation_audio": filename,
-        "how_to_say": how_to_say
+        "audio_stream": stream_audio and filename is None,
+        "how_to_say": how_to_say,
+        "errors": errors
     }
 
+
+def is_learn_cached(language: str, text_input: str) -> bool:
+    """
+    True when process_learn would be answered from cache without any API call
+    """
+    text = pronunciation_pack.native(text_input, language) or transliterate_to_native(text_input, language)
+    if pronunciation_pack.contains(text, language):
+        return True
+    return (
+        audio_cache.contains(audio_cache_key(text, language, TTS_VOICE))
+        and phonetic_store.contains(text, language)
+    )
+
+
+def process_learn_batch(items: list) -> list:
+    """
+    items: (text, language) pairs. Duplicates are processed once, fully
+    cached words are answered inline and the rest run BATCH_CONCURRENCY at a
+    time. Returns one result per input item, in order.
+    """
+    unique = list(dict.fromkeys(items))
+    results = {}
+    pending = {}
+
+    for text, language in unique:
+        if is_learn_cached(language, text):
+            results[(text, language)] = dict(process_learn(language, text), cached=True)
+        else:
+            pending[(text, language)] = batch_executor.submit(process_learn, language, text)
+
+    for item, future in pending.items():
+        try:
+            results[item] = dict(future.result(), cached=False)
+        except Exception as e:
+            print("Batch learn error:", e)
+            text, language = item
+            results[item] = {
+                "language": language,
+                "text": text,
+                "pronunciation_audio": None,
+                "how_to_say": None,
+                "errors": ["Processing failed"],
+                "cached": False
+            }
+
+    return [results[item] for item in items]
+
+# --------------------------------------------------
+# METRICS
+# --------------------------------------------------
+def _metric_samples():
+    samples = []
+    samples += metrics.cache_samples("audio", audio_cache.stats())
+    samples += metrics.cache_samples("phonetic_help", phonetic_store.stats())
+    samples += metrics.cache_samples("transcripts", transcript_store.stats())
+    samples += metrics.cache_samples("transliteration", transliteration_memo_stats())
+    samples += metrics.cache_samples("transliteration_shared", transliteration_cache.stats())
+    if pronunciation_pack.loaded:
+        samples += metrics.cache_samples("pronunciation_pack", pronunciation_pack.stats())
+
+    for name, state in api_clients.stats()["breakers"].items():
+        samples.append((
+            "circuit_open", "gauge", "1 while a dependency's circuit breaker is open",
+            {"dependency": name}, int(state == "open")
+        ))
+
+    flights = single_flight.stats()
+    samples.append((
+        "single_flight_waits_total", "counter", "Cache misses that waited on another computation",
+        {}, flights["waited"]
+    ))
+    samples.append((
+        "single_flight_timeouts_total", "counter", "Waits that gave up and computed anyway",
+        {}, flights["timeouts"]
+    ))
+
+    for field, value in phonetic_batcher.stats().items():
+        samples.append((
+            f"phonetic_batch_{field}_total", "counter",
+            f"Phonetic help micro-batching: {field.replace('_', ' ')}", {}, value
+        ))
+
+    for field, value in history_store.stats().items():
+        samples.append((
+            f"history_attempts_{field}_total", "counter", f"/check attempts {field} in the history",
+            {}, value
+        ))
+
+    for field, value in job_queue.stats().items():
+        samples.append((
+            f"jobs_{field}_total", "counter", f"Background jobs {field}", {}, value
+        ))
+
+    for phase in ("import", "preload", "first_request"):
+        seconds = startup_report.get(f"{phase}_seconds")
+        if seconds is not None:
+            samples.append((
+                "startup_seconds", "gauge", "Seconds from boot to each startup milestone",
+                {"phase": phase}, round(seconds, 3)
+            ))
+
+    pool = ocr_pool.stats()
+    for field in ("submitted", "rejected", "timed_out"):
+        samples.append((
+            f"ocr_jobs_{field}_total", "counter", f"OCR pool jobs {field.replace('_', ' ')}",
+            {}, pool[field]
+        ))
+    return samples
+
+
+if metrics.ENABLED:
+    api_clients.observers.append(metrics.observe_external)
+    metrics.register_collector(_metric_samples)
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        if "first_request_seconds" not in startup_report:
+            startup_report["first_request_seconds"] = time.time() - BOOT_STARTED
+
+        started = g.pop("request_started", None)
+        if started is not None:
+            metrics.observe_request(
+                request.endpoint or "unmatched",
+                request.method,
+                response.status_code,
+                time.perf_counter() - started
+            )
+        return response
+
+
 # --------------------------------------------------
 # ROUTES
 # --------------------------------------------------
+@app.context_processor
+def audio_formats():
+    return {
+        "compressed_audio": can_transcode(),
+        "streaming_check": sock is not None
+    }
+
+
 @app.route("/")
 def home():
     return render_template("Home.html")
@@ -228,7 +691,10 @@ def home():
 
 @app.route("/learn/<word>")
 def learn_prefilled(word):
+    # ?language= lets /history link any practised word back here
     language = WORD_LANGUAGE_MAP.get(word.lower())
+    if not language and request.args.get("language") in GOOGLE_LANG_MAP:
+        language = request.args["language"]
     if not language:
         return redirect("/learn")
 
@@ -241,6 +707,40 @@ def learn_prefilled(word):
     )
 
 
+def read_image_text(image_bytes: bytes, language: str = None):
+    """
+    (text, None) from the OCR pool, or (None, message for the learner).
+    language selects the native-script Tesseract model. Raises
+    ImageTooLarge for a decompression bomb, checked here from the header
+    before the job takes an OCR pool slot.
+    """
+    try:
+        check_image(image_bytes)
+    except InvalidImage:
+        return None, "Could not read the image."
+
+    try:
+        # Tesseract gets the same budget so a stuck job frees its worker
+        with metrics.timer("extract_text_from_image"):
+            ocr_text = ocr_pool.run(
+                extract_text_from_image,
+                image_bytes,
+                ocr_pool.timeout,
+                language
+            )
+    except OCRPoolFull:
+        return None, "Too many images are being read right now. Please try again shortly."
+    except OCRTimeout:
+        return None, "Reading the image took too long. Try a smaller or clearer photo."
+    except OCRJobError as e:
+        print("OCR error:", e)
+        return None, "Could not read the image."
+
+    if not ocr_text:
+        return None, "No readable text found in image."
+    return ocr_text, None
+
+
 @app.route("/learn", methods=["GET", "POST"])
 def learn():
     result = None
@@ -259,35 +759,19 @@ def learn():
 
         # CASE 1: IMAGE PROVIDED → OCR
         elif image and image.filename:
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-            image.save(tmp.name)
-
-            ocr_text = extract_text_from_image(tmp.name)
-
-            if not ocr_text:
-                error = "No readable text found in image."
+            try:
+                ocr_text, error = read_image_text(read_upload(image), selected_language)
+            except ImageTooLarge as e:
+                error = f"{e}. Please upload a smaller photo."
             else:
-                user_text = ocr_text
-
-                processed_text = (
-                    transliterate_to_native(ocr_text, selected_language)
-                    if is_english(ocr_text)
-                    else ocr_text
-                )
-
-                result = process_learn(selected_language, processed_text)
+                if not error:
+                    user_text = ocr_text
+                    result = process_learn(selected_language, ocr_text, STREAM_TTS)
 
         # CASE 2: TYPED TEXT
         elif typed_text:
             user_text = typed_text
-
-            processed_text = (
-                transliterate_to_native(typed_text, selected_language)
-                if is_english(typed_text)
-                else typed_text
-            )
-
-            result = process_learn(selected_language, processed_text)
+            result = process_learn(selected_language, typed_text, STREAM_TTS)
 
         else:
             error = "Please enter text or upload an image."
@@ -339,6 +823,9 @@ def learn():
 @app.route("/check", methods=["GET", "POST"])
 def check():
     result = None
+    # Issued on the first visit so the live (websocket) check, which cannot
+    # set cookies, is recorded too
+    learner = current_learner(create=True)
 
     if request.method == "POST":
         language = request.form.get("language")
@@ -360,27 +847,534 @@ def check():
         else:
             return render_template("Check.html", result={"error": "No audio provided"})
 
-        spoken_text = transcribe_audio(audio_path, language)
+        try:
+            spoken_text = transcribe_audio(audio_path, language)
+        finally:
+            os.remove(audio_path)
 
         if not spoken_text:
             return render_template("Check.html", result={"error": "Could not understand audio"})
 
-        score = score_pronunciation(expected_text, spoken_text)
+        from Backend.scoring import score_pronunciation
+
+        scored = score_pronunciation(expected_text, spoken_text, language)
+        if expected_text and language in SARVAM_LANG_MAP:
+            history_store.record(learner, expected_text, language, scored["score"], spoken_text)
 
         result = {
             "expected": expected_text,
             "spoken": spoken_text,
-            "score": score
+            "score": scored["score"],
+            "syllables": scored["syllables"]
         }
 
     return render_template("Check.html", result=result)
 
 
+def check_stream(ws):
+    """
+    Websocket protocol for live checking:
+
+    client -> {"language": ..., "expected_text": ...}, then binary chunks of
+              16 kHz mono s16le PCM, then {"type": "stop"}
+    server -> {"type": "partial", "transcript": ...} while audio arrives,
+              then {"type": "final", "expected", "spoken", "score",
+              "syllables"} or {"type": "error", "error": ...}
+    """
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            ws.send(json.dumps(message, ensure_ascii=False))
+
+    try:
+        config = json.loads(ws.receive(timeout=STREAM_CHECK_IDLE) or "{}")
+    except ValueError:
+        config = {}
+    if not isinstance(config, dict):
+        config = {}
+
+    language = config.get("language")
+    expected_text = str(config.get("expected_text", "")).strip().lower()
+    learner = current_learner()
+
+    if language not in SARVAM_LANG_MAP or not expected_text:
+        send({"type": "error", "error": "Choose a language and enter the expected word first."})
+        return
+
+    def chunks():
+        received = 0
+        while received < STREAM_CHECK_MAX_BYTES:
+            message = ws.receive(timeout=STREAM_CHECK_IDLE)
+            if message is None:
+                return
+            if isinstance(message, str):
+                # Control frames; anything that is not {"type": "stop"} is
+                # ignored
+                try:
+                    control = json.loads(message)
+                except ValueError:
+                    continue
+                if isinstance(control, dict) and control.get("type") == "stop":
+                    return
+                continue
+            received += len(message)
+            yield message
+
+    try:
+        spoken_text = stt_stream(
+            client,
+            chunks(),
+            SARVAM_LANG_MAP[language],
+            on_partial=lambda text: send({"type": "partial", "transcript": text})
+        )
+    except Exception as e:
+        print("Streaming check error:", e)
+        send({"type": "error", "error": "Speech recognition is unavailable right now."})
+        return
+
+    spoken_text = spoken_text.strip().lower()
+    if not spoken_text:
+        send({"type": "error", "error": "Could not understand audio"})
+        return
+
+    from Backend.scoring import score_pronunciation
+
+    scored = score_pronunciation(expected_text, spoken_text, language)
+    if learner:
+        history_store.record(learner, expected_text, language, scored["score"], spoken_text)
+
+    send({
+        "type": "final",
+        "expected": expected_text,
+        "spoken": spoken_text,
+        "score": scored["score"],
+        "syllables": scored["syllables"]
+    })
+
+
+if sock is not None:
+    sock.route("/check/stream")(check_stream)
+
+
+@app.route("/api/learn/batch", methods=["POST"])
+def learn_batch():
+    """
+    JSON in: {"items": [{"text": "namaste", "language": "Hindi"}, ...]}
+    JSON out: {"items": [...], "unique": n, "cached": k}, one entry per input
+    """
+    payload = request.get_json(silent=True) or {}
+    raw_items = payload.get("items")
+
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({"error": "Expected a non-empty \"items\" list."}), 400
+    if len(raw_items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per request."}), 400
+
+    items = []
+    for i, raw in enumerate(raw_items):
+        text = str(raw.get("text", "")).strip() if isinstance(raw, dict) else ""
+        language = raw.get("language") if isinstance(raw, dict) else None
+
+        if not text or language not in GOOGLE_LANG_MAP:
+            return jsonify({"error": f"Item {i} needs text and a supported language."}), 400
+        items.append((text, language))
+
+    results = process_learn_batch(items)
+
+    response_items = []
+    for (text_input, _), result in zip(items, results):
+        filename = result["pronunciation_audio"]
+        response_items.append({
+            "input": text_input,
+            "language": result["language"],
+            "text": result["text"],
+            "how_to_say": result["how_to_say"],
+            "audio_url": url_for("serve_audio", filename=filename) if filename else None,
+            "cached": result["cached"],
+            "errors": result["errors"]
+        })
+
+    return jsonify({
+        "items": response_items,
+        "unique": len(set(items)),
+        "cached": len({item for item, r in zip(items, results) if r["cached"]})
+    })
+
+
+def run_learn_job(emit, language, text_input, image_bytes):
+    if image_bytes is not None:
+        text_input, error = read_image_text(image_bytes, language)
+        if error:
+            raise ValueError(error)
+        emit("ocr", {"text": text_input})
+
+    result = process_learn(language, text_input, on_stage=emit)
+    if result["errors"]:
+        emit("errors", {"errors": result["errors"]})
+    return result
+
+
+@app.route("/api/learn/jobs", methods=["POST"])
+def create_learn_job():
+    """
+    Form or JSON in: language, text_input and/or an "image" upload
+    JSON out (202): {"job_id", "status_url", "events_url"}
+    """
+    payload = request.get_json(silent=True) or request.form
+    language = payload.get("language")
+    text_input = str(payload.get("text_input", "")).strip()
+    image = request.files.get("image")
+
+    if language not in GOOGLE_LANG_MAP:
+        return jsonify({"error": "Please select a language."}), 400
+
+    image_bytes = None
+    if image and image.filename:
+        try:
+            image_bytes = read_upload(image)
+            check_image(image_bytes)
+        except InvalidImage:
+            return jsonify({"error": "Could not read the image."}), 400
+        except ImageTooLarge as e:
+            return jsonify({"error": f"{e}. Please upload a smaller photo."}), 413
+    elif not text_input:
+        return jsonify({"error": "Please enter text or upload an image."}), 400
+
+    try:
+        job_id = job_queue.submit("learn", run_learn_job, language, text_input, image_bytes)
+    except JobQueueFull:
+        return jsonify({"error": "The server is busy. Please try again shortly."}), 503
+
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for("learn_job_status", job_id=job_id),
+        "events_url": url_for("learn_job_events", job_id=job_id)
+    }), 202
+
+
+@app.route("/api/learn/jobs/<job_id>")
+def learn_job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+    return jsonify(job)
+
+
+@app.route("/api/learn/jobs/<job_id>/events")
+def learn_job_events(job_id):
+    """
+    Server-Sent Events: one event per stage as it finishes ("text",
+    "how_to_say", "audio", ...), then "done" with the full result or
+    "failed" with the error. Honours Last-Event-ID on reconnect. 503 with
+    the status URL to poll when this worker already has JOB_MAX_STREAMS
+    streams open.
+    """
+    if job_queue.status(job_id) is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+
+    if not job_stream_slots.acquire(blocking=False):
+        response = jsonify({
+            "error": "Too many open job streams; poll status_url instead.",
+            "status_url": url_for("learn_job_status", job_id=job_id)
+        })
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+
+    try:
+        after = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        after = 0
+
+    def stream(after):
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < JOB_STREAM_TIMEOUT:
+            # Read the version, then the status, so no stage recorded before
+            # "done" is missed and no change after the read goes unnoticed
+            seen = job_queue.version
+            status = job_queue.status(job_id)
+
+            for seq, stage, data in job_queue.events(job_id, after):
+                after = seq
+                last_sent = time.monotonic()
+                yield f"id: {seq}\nevent: {stage}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+            if status in ("done", "failed"):
+                job = job_queue.get(job_id)
+                payload = {"result": job["result"]} if status == "done" else {"error": job["error"]}
+                yield f"event: {status}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                return
+
+            if time.monotonic() - last_sent >= JOB_HEARTBEAT:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            now = time.monotonic()
+            job_queue.wait(job_id, seen, min(JOB_HEARTBEAT - (now - last_sent), JOB_STREAM_TIMEOUT - (now - started)))
+
+    response = Response(
+        stream(after),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Runs when the server closes the response, whether or not it was streamed
+    response.call_on_close(job_stream_slots.release)
+    return response
+
+
+def packed_audio_response(data, ext):
+    """
+    Audio straight out of the memory-mapped pack, with the same caching,
+    ETag and Range behaviour as files from the audio cache
+    """
+    response = Response(bytes(data), mimetype=AUDIO_MIMETYPES.get(ext))
+    response.set_etag(request.view_args["filename"])
+    response.cache_control.max_age = AUDIO_MAX_AGE
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+
+
 @app.route("/audio/<filename>")
 def serve_audio(filename):
-    return send_from_directory(AUDIO_OUTPUT_DIR, filename)
+    """
+    Cached pronunciation audio with ETag / Range support (send_file handles
+    If-None-Match and partial requests). ?format=opus or ?format=mp3 serves
+    a smaller transcoded copy of a wav when ffmpeg is installed.
+    """
+    packed = pronunciation_pack.audio(filename)
+    if packed is not None:
+        return packed_audio_response(*packed)
+
+    key, _, ext = filename.rpartition(".")
+    fmt = request.args.get("format")
+
+    if ext == "wav" and fmt in COMPRESSED_FORMATS and can_transcode() and audio_cache.contains(key):
+        try:
+            if audio_cache.get(key, fmt) is None:
+                audio_cache.put(key, transcode_writer(audio_cache.path_for(key), fmt), fmt)
+            filename, ext = audio_cache.filename_for(key, fmt), fmt
+        except Exception as e:
+            print("Transcode error:", e)
+
+    response = send_from_directory(
+        AUDIO_OUTPUT_DIR,
+        filename,
+        mimetype=AUDIO_MIMETYPES.get(ext),
+        conditional=True,
+        max_age=AUDIO_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route("/assets/<path:filename>")
+def serve_asset(filename):
+    """
+    Fingerprinted static files, cached for a year. Text assets are sent
+    precompressed (brotli, then gzip) when the browser accepts it.
+    """
+    sent, encoding = static_assets.encoded(
+        filename,
+        lambda name: request.accept_encodings.quality(name) > 0
+    )
+    response = send_from_directory(
+        STATIC_BUILD_DIR,
+        sent,
+        mimetype=mimetypes.guess_type(filename)[0],
+        conditional=True,
+        max_age=STATIC_MAX_AGE
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route("/audio/stream")
+def stream_audio():
+    """
+    Streams MP3 from Sarvam's streaming TTS while it is being synthesised,
+    caching the complete file for later requests. If streaming cannot start,
+    falls back to the regular TTS call and redirects to the cached file.
+    """
+    language = request.args.get("language")
+    text = request.args.get("text", "").strip()
+
+    if language not in GOOGLE_LANG_MAP or not text:
+        return jsonify({"error": "text and a supported language are required"}), 400
+
+    filename = cached_audio_filename(text, language)
+    if filename:
+        return redirect(url_for("serve_audio", filename=filename))
+
+    key = audio_cache_key(text, language, TTS_VOICE)
+    # Held until the response closes: a concurrent request for the word
+    # waits here and is then redirected to the file this one cached
+    flight = contextlib.ExitStack()
+    flight.enter_context(audio_cache.hold(key))
+    try:
+        filename = cached_audio_filename(text, language)
+        if filename:
+            flight.close()
+            return redirect(url_for("serve_audio", filename=filename))
+
+        chunks = tts_stream(client, text, GOOGLE_LANG_MAP[language] + "-IN")
+    except Exception as e:
+        flight.close()
+        # Nothing has been sent yet, so the whole file can still be made
+        # with the regular TTS call
+        print("Streaming TTS error:", e)
+        try:
+            filename = synthesize_audio(text, language)
+        except Exception as e:
+            print("TTS error:", e)
+            return jsonify({"error": "Pronunciation audio is unavailable right now."}), 503
+        return redirect(url_for("serve_audio", filename=filename))
+
+    body = tee_to_cache(
+        chunks,
+        audio_cache,
+        key,
+        "mp3",
+        text=text,
+        language=language,
+        voice=TTS_VOICE
+    )
+
+    response = Response(
+        body,
+        mimetype=AUDIO_MIMETYPES["mp3"],
+        headers={"Cache-Control": "no-store"}
+    )
+    response.call_on_close(flight.close)
+    return response
+
+
+@app.route("/history")
+def history():
+    learner = current_learner()
+    return render_template(
+        "History.html",
+        history=history_store.history(learner) if learner else None
+    )
+
+
+@app.route("/api/history")
+def history_api():
+    """
+    {"summary", "to_practise", "words", "recent"} for the calling learner
+    """
+    learner = current_learner()
+    if learner is None:
+        return jsonify({"error": "No history yet: check a word first"}), 404
+    return jsonify(history_store.history(learner))
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/about")
 def about():
     return render_template("About.html")
+
+
+# --------------------------------------------------
+# APP FACTORY
+# --------------------------------------------------
+# Load the heavy, read-only state up front. With gunicorn's preload_app (see
+# gunicorn.conf.py) this happens once in the master and the forked workers
+# share those pages copy-on-write; APP_PRELOAD=0 leaves everything lazy.
+PRELOAD = os.getenv("APP_PRELOAD", "1") == "1"
+
+PRELOAD_MODULES = (
+    "sarvamai",             # SDK and its pydantic models
+    "sarvamai.play",
+    "Backend.audio_prep",   # numpy
+    "Backend.scoring",      # phoneme cost tables
+    "cv2",
+    "PIL.Image",
+)
+
+startup_report = {"import_seconds": time.time() - BOOT_STARTED}
+
+
+def preload() -> dict:
+    """
+    Imports the heavy stacks and loads read-only data (transliteration
+    tables, OCR models listed in OCR_PREWARM_LANGUAGES). Opens no sockets,
+    threads or SQLite connections, so it is safe to run before fork.
+    Returns seconds spent per item.
+    """
+    from Backend.ApiCalls.ocr.ocr_engine import prewarm_from_env
+
+    timings = {}
+    for name in PRELOAD_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Preload skipped {name}:", e)
+            continue
+        timings[name] = time.perf_counter() - started
+
+    for name, load in (
+        ("transliteration", transliteration.get_backends),
+        ("ocr_models", prewarm_from_env),
+    ):
+        started = time.perf_counter()
+        load()
+        timings[name] = time.perf_counter() - started
+
+    return timings
+
+
+def create_app(preload_data: bool = PRELOAD) -> Flask:
+    """
+    Entry point for gunicorn ("app:create_app()") and tooling. Importing
+    this module is cheap and needs no secrets; preload_data loads the heavy
+    stacks now instead of on each worker's first request.
+    """
+    if STATIC_REBUILD and "static_assets" not in startup_report:
+        started = time.perf_counter()
+        static_assets.load()
+        startup_report["static_assets"] = time.perf_counter() - started
+
+    if preload_data and "preload_seconds" not in startup_report:
+        started = time.perf_counter()
+        startup_report["preload"] = preload()
+        startup_report["preload_seconds"] = time.perf_counter() - started
+
+    log_startup_report()
+    return app
+
+
+def log_startup_report():
+    report = startup_report
+    line = f"Startup: import {report['import_seconds']:.2f}s"
+
+    if "preload" in report:
+        slowest = sorted(report["preload"].items(), key=lambda kv: -kv[1])[:3]
+        line += f", preload {report['preload_seconds']:.2f}s (" + ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in slowest
+        ) + ")"
+    else:
+        line += ", preload off"
+
+    if pronunciation_pack.loaded:
+        line += f", pronunciation pack {pronunciation_pack.stats()['entries']} entries"
+    if static_assets.loaded:
+        line += f", static assets {static_assets.stats()['assets']}"
+    else:
+        line += ", static assets unbuilt"
+    line += f", ffmpeg {'yes' if can_transcode() else 'no'}"
+    line += f", websockets {'yes' if sock else 'no'}"
+    print(line)
+
+    if not os.getenv("SARVAM_API_KEY"):
+        print("Startup: SARVAM_API_KEY is not set; TTS, STT and phonetic help calls will fail")
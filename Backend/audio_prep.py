@@ -0,0 +1,301 @@
+'''
+Shrinks recordings before they are sent to speech-to-text.
+
+Uploads are decoded into a NumPy array, downmixed to mono, resampled to the
+STT model's native 16 kHz, trimmed of leading / trailing silence with a
+frame-energy VAD and capped in length, then re-encoded as 16-bit PCM wav.
+A typical 48 kHz stereo upload with a second of dead air either side comes
+out well over ten times smaller.
+
+WAV is decoded natively; anything else (the browser's webm / ogg captures,
+mp3, m4a) goes through ffmpeg when it is installed and is otherwise passed
+through untouched.
+'''
+import io
+import os
+import struct
+import subprocess
+import wave
+
+import numpy as np
+
+from Backend.audio_stream import FFMPEG
+from Backend.metrics import timed
+
+
+ENABLED = os.getenv("STT_PREPROCESS", "1") == "1"
+
+TARGET_RATE = 16000
+MAX_SECONDS = float(os.getenv("STT_MAX_SECONDS", 30))
+DECODE_TIMEOUT = 20
+
+# VAD: 20 ms frames; speech is anything within SPEECH_RANGE_DB of the loudest
+# frame and above SILENCE_FLOOR_DBFS, padded so word edges are not clipped
+FRAME_SECONDS = 0.02
+SPEECH_RANGE_DB = 35
+SILENCE_FLOOR_DBFS = -50
+PAD_SECONDS = 0.15
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class UnsupportedAudio(ValueError):
+    pass
+
+
+# --------------------------------------------------
+# DECODE
+# --------------------------------------------------
+def _riff_chunks(data: bytes):
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise UnsupportedAudio("not a RIFF/WAVE file")
+
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = data[offset + 8: offset + 8 + size]
+        yield chunk_id, body
+        offset += 8 + size + (size & 1)
+
+
+def decode_wav(data: bytes):
+    """
+    (samples, rate) with samples float32 in [-1, 1] shaped (frames, channels).
+    Handles integer PCM of 8-32 bits and 32/64-bit float, plain or
+    WAVE_FORMAT_EXTENSIBLE, which covers what the stdlib wave module rejects.
+    """
+    fmt = None
+    frames = None
+    for chunk_id, body in _riff_chunks(data):
+        if chunk_id == b"fmt ":
+            fmt = body
+        elif chunk_id == b"data":
+            frames = body
+
+    if fmt is None or frames is None:
+        raise UnsupportedAudio("wav is missing its fmt or data chunk")
+
+    if len(fmt) < 16:
+        raise UnsupportedAudio("wav fmt chunk is truncated")
+
+    tag, channels, rate, _, block_align, bits = struct.unpack_from("<HHIIHH", fmt)
+    if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        tag = struct.unpack_from("<H", fmt, 24)[0]
+    if not channels or not rate:
+        raise UnsupportedAudio("wav header has no channels or sample rate")
+    if bits not in (8, 16, 24, 32, 64):
+        raise UnsupportedAudio(f"unsupported wav sample size ({bits} bits)")
+
+    width = bits // 8
+    usable = len(frames) - len(frames) % (width * channels)
+    raw = frames[:usable]
+
+    if tag == WAVE_FORMAT_IEEE_FLOAT and width in (4, 8):
+        samples = np.frombuffer(raw, dtype=f"<f{width}").astype(np.float32)
+    elif tag == WAVE_FORMAT_PCM and width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif tag == WAVE_FORMAT_PCM and width in (2, 4):
+        samples = np.frombuffer(raw, dtype=f"<i{width}").astype(np.float32) / (2 ** (bits - 1))
+    elif tag == WAVE_FORMAT_PCM and width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 0x800000
+    else:
+        raise UnsupportedAudio(f"unsupported wav encoding (format {tag}, {bits} bits)")
+
+    return samples.reshape(-1, channels), rate
+
+
+def decode_with_ffmpeg(data: bytes):
+    """
+    Any container ffmpeg understands, already downmixed and resampled
+    """
+    if FFMPEG is None:
+        raise UnsupportedAudio("ffmpeg is not installed")
+
+    result = subprocess.run(
+        [FFMPEG, "-v", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+        input=data,
+        capture_output=True,
+        timeout=DECODE_TIMEOUT
+    )
+    if result.returncode != 0:
+        raise UnsupportedAudio(result.stderr.decode("utf-8", "replace").strip() or "ffmpeg failed")
+
+    samples = np.frombuffer(result.stdout, dtype="<i2").astype(np.float32) / 32768
+    return samples.reshape(-1, 1), TARGET_RATE
+
+
+def decode(data: bytes):
+    if data[:4] == b"RIFF":
+        try:
+            return decode_wav(data)
+        except UnsupportedAudio:
+            if FFMPEG is None:
+                raise
+    return decode_with_ffmpeg(data)
+
+
+# --------------------------------------------------
+# TRANSFORMS
+# --------------------------------------------------
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def _lowpass_taps(cutoff: float, taps: int = 63) -> np.ndarray:
+    """
+    Hann-windowed sinc; cutoff as a fraction of the sample rate
+    """
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff * n) * np.hanning(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples: np.ndarray, rate: int, target: int = TARGET_RATE) -> np.ndarray:
+    if rate == target or not len(samples):
+        return samples
+
+    if target < rate:
+        # Band-limit below the new Nyquist before dropping samples
+        samples = np.convolve(samples, _lowpass_taps(0.45 * target / rate), mode="same")
+
+    duration = len(samples) / rate
+    positions = np.arange(int(duration * target)) * (rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def speech_bounds(samples: np.ndarray, rate: int = TARGET_RATE):
+    """
+    (start, end) sample indices of the voiced region, or None when the clip
+    never rises above the silence floor
+    """
+    frame = max(1, int(FRAME_SECONDS * rate))
+    count = len(samples) // frame
+    if count == 0:
+        return None
+
+    frames = samples[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    db = 20 * np.log10(rms)
+
+    threshold = max(db.max() - SPEECH_RANGE_DB, SILENCE_FLOOR_DBFS)
+    voiced = np.flatnonzero(db >= threshold)
+    if not len(voiced) or db.max() < SILENCE_FLOOR_DBFS:
+        return None
+
+    pad = int(PAD_SECONDS * rate)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return start, end
+
+
+def encode_wav(samples: np.ndarray, rate: int = TARGET_RATE) -> bytes:
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+# --------------------------------------------------
+# FINGERPRINT
+# --------------------------------------------------
+# Sign of the energy change between adjacent bands from one frame to the
+# next: robust to gain, mild noise and lossy re-encoding, unlike a byte hash
+FINGERPRINT_FRAME = 512
+FINGERPRINT_BANDS = np.geomspace(150, 4000, 6)
+FINGERPRINT_MAX_SHIFT = 2
+
+
+def fingerprint(samples: np.ndarray, rate: int = TARGET_RATE):
+    """
+    (packed bits, frame count) for normalized samples
+    """
+    count = len(samples) // FINGERPRINT_FRAME
+    if count < 2:
+        return b"", 0
+
+    frames = samples[:count * FINGERPRINT_FRAME].reshape(count, FINGERPRINT_FRAME)
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FINGERPRINT_FRAME), axis=1)) ** 2
+    freqs = np.fft.rfftfreq(FINGERPRINT_FRAME, 1 / rate)
+
+    edges = np.searchsorted(freqs, FINGERPRINT_BANDS)
+    energy = np.stack(
+        [spectrum[:, lo:hi].sum(axis=1) for lo, hi in zip(edges[:-1], edges[1:])],
+        axis=1
+    )
+    band_diff = np.diff(np.log(energy + 1e-10), axis=1)
+    bits = np.diff(band_diff, axis=0) > 0
+
+    return np.packbits(bits).tobytes(), len(bits)
+
+
+def fingerprint_distance(a: bytes, frames_a: int, b: bytes, frames_b: int) -> float:
+    """
+    Bit error rate between two fingerprints at the best alignment within a
+    few frames; 0 is identical, ~0.5 is unrelated audio
+    """
+    width = len(FINGERPRINT_BANDS) - 2
+    bits_a = np.unpackbits(np.frombuffer(a, np.uint8))[:frames_a * width].reshape(-1, width)
+    bits_b = np.unpackbits(np.frombuffer(b, np.uint8))[:frames_b * width].reshape(-1, width)
+
+    best = 1.0
+    for shift in range(-FINGERPRINT_MAX_SHIFT, FINGERPRINT_MAX_SHIFT + 1):
+        x = bits_a[max(0, shift):]
+        y = bits_b[max(0, -shift):]
+        n = min(len(x), len(y))
+        if n == 0:
+            continue
+        # Frames that only one side has count as mismatches
+        errors = np.count_nonzero(x[:n] != y[:n]) + width * (max(len(x), len(y)) - n)
+        best = min(best, errors / (width * max(len(x), len(y))))
+    return best
+
+
+# --------------------------------------------------
+# PUBLIC API
+# --------------------------------------------------
+def normalize(data: bytes):
+    """
+    Mono 16 kHz float32 samples with silence trimmed and length capped, or
+    None when the audio cannot be decoded here
+    """
+    try:
+        samples, rate = decode(data)
+    except (UnsupportedAudio, subprocess.TimeoutExpired) as e:
+        print("Audio prep skipped:", e)
+        return None
+
+    samples = resample(downmix(samples), rate)
+
+    # A clip with no detectable speech is kept whole and left to the STT
+    bounds = speech_bounds(samples)
+    if bounds:
+        samples = samples[bounds[0]:bounds[1]]
+
+    return samples[:int(MAX_SECONDS * TARGET_RATE)]
+
+
+@timed("audio_prep")
+def prepare_for_stt(data: bytes, filename: str):
+    """
+    Returns (audio_bytes, filename) ready for upload: a trimmed 16 kHz mono
+    wav, or the original bytes when the audio cannot be decoded here.
+    """
+    if not ENABLED or not data:
+        return data, filename
+
+    samples = normalize(data)
+    if samples is None:
+        return data, filename
+
+    stem = os.path.splitext(filename)[0] or "audio"
+    return encode_wav(samples), f"{stem}.wav"
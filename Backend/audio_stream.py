@@ -0,0 +1,72 @@
+'''
+Helpers for delivering pronunciation audio: teeing a live TTS stream into
+the audio cache, and transcoding cached wavs to smaller formats for mobile
+clients when ffmpeg is available.
+'''
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+# ext → (mimetype, ffmpeg output args)
+COMPRESSED_FORMATS = {
+    "opus": ("audio/ogg", ["-c:a", "libopus", "-b:a", "24k", "-f", "ogg"]),
+    "mp3": ("audio/mpeg", ["-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3"]),
+}
+
+MIMETYPES = {
+    "wav": "audio/wav",
+    **{ext: mime for ext, (mime, _) in COMPRESSED_FORMATS.items()}
+}
+
+# Decoding a streamed mp3 back to the wav the rest of the app expects
+WAV_ARGS = ["-ac", "1", "-c:a", "pcm_s16le", "-f", "wav"]
+
+FFMPEG = shutil.which("ffmpeg")
+TRANSCODE_TIMEOUT = 30
+
+
+def can_transcode() -> bool:
+    return FFMPEG is not None
+
+
+def transcode_writer(src_path, ext):
+    """
+    Returns a writer(path) for AudioCache.put that encodes src_path to ext
+    (one of COMPRESSED_FORMATS, or wav)
+    """
+    args = WAV_ARGS if ext == "wav" else COMPRESSED_FORMATS[ext][1]
+
+    def write(path):
+        subprocess.run(
+            [FFMPEG, "-v", "error", "-y", "-i", str(src_path), *args, path],
+            check=True,
+            timeout=TRANSCODE_TIMEOUT
+        )
+
+    return write
+
+
+def tee_to_cache(chunks, cache, key, ext, **meta):
+    """
+    Yields each chunk as it arrives while spooling it to a temp file in the
+    cache directory. Only a stream that completes is committed to the cache;
+    a failed synthesis or a client disconnect leaves nothing behind. The
+    caller holds cache.hold(key) from before the TTS call until the response
+    closes, so concurrent requests for the word wait for this one.
+    """
+    cache.directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=cache.directory, suffix=".part")
+
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            for chunk in chunks:
+                spool.write(chunk)
+                yield chunk
+
+        cache.put(key, lambda path: os.replace(tmp_name, path), ext, **meta)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_name)
@@ -0,0 +1,274 @@
+'''
+Content-addressed cache for generated pronunciation audio.
+
+Files are named after a hash of (normalized text, language, voice) so two
+different words can never share a wav. A small manifest.json next to the
+files indexes every entry (size + last access) which gives O(1) lookups and
+lets us evict the least recently used files once the size budget is hit.
+Other encodings of the same audio (streamed mp3, transcoded opus) live next
+to the wav under the same key with a different extension.
+
+Misses are single-flight across workers: concurrent requests for the same
+uncached word wait for whichever one synthesises it instead of each calling
+TTS. The lock is per word, not per encoding, so a streamed mp3 and a wav for
+the same word are never synthesised at the same time.
+'''
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+
+from Backend.cache.shared import SingleFlight
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
+
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+DEFAULT_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Persisting a touch on every hit would rewrite the manifest for each request,
+# so access times are only written back once they are this stale.
+TOUCH_INTERVAL = 60
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(text: str, language: str, voice: str) -> str:
+    raw = "\x1f".join([normalize_text(text), language, voice])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class AudioCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, flights=None):
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.flights = flights or SingleFlight(self.directory / ".locks")
+        self.manifest_path = self.directory / MANIFEST_NAME
+        self.lock_path = self.directory / ".manifest.lock"
+
+        self._entries = {}
+        self._manifest_mtime = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_written = 0
+        self.bytes_evicted = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    # --------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------
+    @staticmethod
+    def filename_for(key: str, ext: str = "wav") -> str:
+        return f"{key}.{ext}"
+
+    def path_for(self, key: str, ext: str = "wav") -> pathlib.Path:
+        return self.directory / self.filename_for(key, ext)
+
+    def get(self, key: str, ext: str = "wav"):
+        """
+        Returns the cached file path for key or None, counting a hit or miss.
+        """
+        name = self.filename_for(key, ext)
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(name)
+            path = self.directory / name
+
+            if entry is None or not path.exists():
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            now = time.time()
+            if now - entry["last_access"] > TOUCH_INTERVAL:
+                with self._manifest_lock():
+                    self._refresh()
+                    if name in self._entries:
+                        self._entries[name]["last_access"] = now
+                        self._write_manifest()
+
+            return path
+
+    def contains(self, key: str, ext: str = "wav") -> bool:
+        """
+        Like get() but without counting a hit/miss or touching the entry
+        """
+        name = self.filename_for(key, ext)
+        with self._lock:
+            self._refresh()
+            return name in self._entries and (self.directory / name).exists()
+
+    def put(self, key: str, writer, ext: str = "wav", **meta) -> pathlib.Path:
+        """
+        writer(path) must write the audio to the given temporary path. The
+        file is moved into place atomically and the manifest is updated.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+
+        try:
+            writer(tmp_name)
+            size = os.path.getsize(tmp_name)
+            final_path = self.path_for(key, ext)
+            os.replace(tmp_name, final_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_name)
+            raise
+
+        with self._lock, self._manifest_lock():
+            self._refresh()
+            self._entries[final_path.name] = {
+                "size": size,
+                "last_access": time.time(),
+                **meta
+            }
+            self.bytes_written += size
+            self._evict(keep=final_path.name)
+            self._write_manifest()
+
+        return final_path
+
+    def hold(self, key: str):
+        """
+        Single-flight lock for synthesising key's audio in any encoding
+        """
+        return self.flights.hold(f"audio\x1f{key}")
+
+    def get_or_create(self, text: str, language: str, voice: str, writer, ext: str = "wav") -> str:
+        """
+        Returns the cache filename for (text, language, voice), calling
+        writer(path) to synthesise it on a miss.
+        """
+        key = cache_key(text, language, voice)
+        if self.get(key, ext) is not None:
+            return self.filename_for(key, ext)
+
+        with self.hold(key):
+            if self.contains(key, ext):
+                self.coalesced += 1
+            else:
+                self.put(
+                    key,
+                    writer,
+                    ext,
+                    text=normalize_text(text),
+                    language=language,
+                    voice=voice
+                )
+        return self.filename_for(key, ext)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e["size"] for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "bytes_written": self.bytes_written,
+                "bytes_evicted": self.bytes_evicted,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced
+            }
+
+    # --------------------------------------------------
+    # MANIFEST
+    # --------------------------------------------------
+    @contextlib.contextmanager
+    def _manifest_lock(self):
+        """
+        Serialises manifest writes between gunicorn workers.
+        """
+        if fcntl is None:
+            yield
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._entries = {}
+            self._manifest_mtime = None
+            return
+
+        if mtime == self._manifest_mtime:
+            return
+
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print("Audio cache manifest unreadable, starting fresh:", e)
+            data = {}
+
+        if data.get("version") == MANIFEST_VERSION:
+            self._entries = data.get("entries", {})
+        elif data.get("version") == 1:
+            # v1 was keyed by hash and only ever held wavs
+            self._entries = {
+                self.filename_for(key): entry
+                for key, entry in data.get("entries", {}).items()
+            }
+        else:
+            self._entries = {}
+        self._manifest_mtime = mtime
+
+    def _write_manifest(self):
+        payload = json.dumps(
+            {"version": MANIFEST_VERSION, "entries": self._entries},
+            ensure_ascii=False
+        )
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_name, self.manifest_path)
+        self._manifest_mtime = self.manifest_path.stat().st_mtime_ns
+
+    def _evict(self, keep=None):
+        total = sum(e["size"] for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+
+        by_age = sorted(self._entries.items(), key=lambda kv: kv[1]["last_access"])
+        for name, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+
+            with contextlib.suppress(FileNotFoundError):
+                (self.directory / name).unlink()
+
+            del self._entries[name]
+            total -= entry["size"]
+            self.bytes_evicted += entry["size"]
+            self.evictions += 1
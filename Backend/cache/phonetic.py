@@ -0,0 +1,171 @@
+'''
+Persistent store for phonetic_help explanations.
+
+Backed by SQLite in WAL mode so every gunicorn worker on the box shares the
+same answers. Entries are keyed on (text, language, prompt version, model
+params), expire after a TTL and the least recently used rows are trimmed once
+the table grows past max_entries. A miss is computed by one caller at a
+time across workers (see cache.shared.SingleFlight); the others wait and
+read its answer.
+'''
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from Backend.cache.audio import normalize_text
+from Backend.cache.shared import SingleFlight
+
+
+DEFAULT_TTL = int(os.getenv("PHONETIC_CACHE_TTL", 30 * 24 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.getenv("PHONETIC_CACHE_MAX_ENTRIES", 20000))
+
+# Expired / surplus rows are swept every this many writes rather than on each
+PRUNE_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS phonetic_help (
+    key         TEXT PRIMARY KEY,
+    text        TEXT NOT NULL,
+    language    TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phonetic_help_last_access
+    ON phonetic_help (last_access);
+"""
+
+
+def store_key(text: str, language: str, prompt_version: str, model_params: dict) -> str:
+    raw = "\x1f".join([
+        normalize_text(text),
+        language or "",
+        prompt_version,
+        json.dumps(model_params, sort_keys=True)
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PhoneticHelpStore:
+    def __init__(self, path, prompt_version, model_params,
+                 ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, flights=None):
+        self.path = pathlib.Path(path)
+        self.prompt_version = prompt_version
+        self.model_params = model_params
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flights = flights or SingleFlight(self.path.parent / "locks")
+
+        self._local = threading.local()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def key(self, text: str, language: str) -> str:
+        return store_key(text, language, self.prompt_version, self.model_params)
+
+    def get(self, text: str, language: str):
+        key = self.key(text, language)
+        now = time.time()
+        conn = self._conn()
+
+        row = conn.execute(
+            "SELECT value, created_at FROM phonetic_help WHERE key = ?",
+            (key,)
+        ).fetchone()
+
+        if row is None or now - row[1] > self.ttl:
+            self.misses += 1
+            return None
+
+        conn.execute(
+            "UPDATE phonetic_help SET last_access = ? WHERE key = ?",
+            (now, key)
+        )
+        self.hits += 1
+        return row[0]
+
+    def contains(self, text: str, language: str) -> bool:
+        row = self._conn().execute(
+            "SELECT created_at FROM phonetic_help WHERE key = ?",
+            (self.key(text, language),)
+        ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def put(self, text: str, language: str, value: str):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO phonetic_help "
+            "(key, text, language, value, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key(text, language), normalize_text(text), language or "", value, now, now)
+        )
+
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def get_or_compute(self, text: str, language: str, compute) -> str:
+        value = self.get(text, language)
+        if value is not None:
+            return value
+
+        key = self.key(text, language)
+        with self.flights.hold(f"phonetic_help\x1f{key}"):
+            # Another worker may have answered while this one waited
+            row = self._conn().execute(
+                "SELECT value, created_at FROM phonetic_help WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is not None and time.time() - row[1] <= self.ttl:
+                self.coalesced += 1
+                return row[0]
+
+            value = compute()
+            if value:
+                self.put(text, language, value)
+        return value
+
+    def prune(self):
+        conn = self._conn()
+        conn.execute(
+            "DELETE FROM phonetic_help WHERE created_at < ?",
+            (time.time() - self.ttl,)
+        )
+        conn.execute(
+            "DELETE FROM phonetic_help WHERE key IN ("
+            "  SELECT key FROM phonetic_help ORDER BY last_access DESC"
+            "  LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        entries = self._conn().execute("SELECT COUNT(*) FROM phonetic_help").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,294 @@
+'''
+Cache tier shared by every gunicorn worker on the box.
+
+Two pieces:
+
+  SingleFlight  per-key lock that spans threads and processes (flock on a
+                lock file per key, in a directory per cache namespace, removed
+                by its holder on release). The first caller to miss
+                computes the entry; concurrent callers for the same key in
+                any worker wait for it and then read the stored result
+                instead of repeating the TTS / chat / transliteration call.
+
+  SharedCache   string key -> string value table in SQLite (WAL) with a TTL,
+                an LRU cap and get_or_compute() built on SingleFlight.
+                Several namespaces can share one database file.
+
+The audio and phonetic help stores keep their own storage and use
+SingleFlight directly; SharedCache backs results that had no cross-worker
+store before (transliteration).
+'''
+import contextlib
+import hashlib
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
+
+
+DEFAULT_TTL = int(os.getenv("SHARED_CACHE_TTL", 30 * 24 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", 50000))
+
+# A waiter gives up and computes the entry itself after this long, so a
+# crashed or wedged owner only costs latency
+FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", 60))
+FLIGHT_POLL = 0.02
+
+PRUNE_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_cache (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS shared_cache_last_access
+    ON shared_cache (namespace, last_access);
+"""
+
+
+# --------------------------------------------------
+# SINGLE FLIGHT
+# --------------------------------------------------
+class SingleFlight:
+    def __init__(self, directory, timeout=FLIGHT_TIMEOUT):
+        self.directory = pathlib.Path(directory)
+        self.timeout = timeout
+
+        # Used where flock is unavailable; only coalesces within a process.
+        # {key: [lock, holders and waiters]}
+        self._thread_locks = {}
+        self._thread_locks_guard = threading.Lock()
+
+        self.waited = 0
+        self.timeouts = 0
+
+    def _lock_path(self, key: str) -> pathlib.Path:
+        """
+        One file per key, under a directory for the key's namespace (the
+        part before the first unit separator), so no two keys share a lock
+        """
+        namespace, separator, _ = key.partition("\x1f")
+        namespace = re.sub(r"[^\w-]", "_", namespace) if separator else "default"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / namespace / f"{digest}.lock"
+
+    @contextlib.contextmanager
+    def hold(self, key: str):
+        """
+        Held by one caller per key at a time across all workers. Callers
+        re-check their cache once inside: a previous holder may have just
+        stored the entry.
+        """
+        if fcntl is None:
+            with self._hold_in_process(key):
+                yield
+            return
+
+        path = self._lock_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            # Each open() is its own lock owner, so threads of one worker
+            # exclude each other just like separate workers do
+            lock_file = open(path, "a")
+            acquired = self._flock(lock_file, deadline)
+            if not acquired or _same_file(lock_file, path):
+                break
+            # The previous holder finished and removed the file while we
+            # waited on it; lock the current one instead
+            lock_file.close()
+
+        try:
+            yield
+        finally:
+            if acquired:
+                # Removed while still locked, so the directory only holds
+                # keys that are being computed right now
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    @contextlib.contextmanager
+    def _hold_in_process(self, key: str):
+        with self._thread_locks_guard:
+            entry = self._thread_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        lock = entry[0]
+        acquired = lock.acquire(blocking=False)
+        if not acquired:
+            self.waited += 1
+            acquired = lock.acquire(timeout=self.timeout)
+            if not acquired:
+                self.timeouts += 1
+        try:
+            yield
+        finally:
+            if acquired:
+                lock.release()
+            with self._thread_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._thread_locks[key]
+
+    def _flock(self, lock_file, deadline: float) -> bool:
+        """
+        Polls rather than blocking so a waiter can give up after the timeout
+        """
+        attempts = 0
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                pass
+
+            attempts += 1
+            if attempts == 1:
+                self.waited += 1
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                return False
+            time.sleep(FLIGHT_POLL)
+
+    def stats(self) -> dict:
+        return {
+            "waited": self.waited,
+            "timeouts": self.timeouts
+        }
+
+
+def _same_file(lock_file, path) -> bool:
+    try:
+        return os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+# --------------------------------------------------
+# KEY / VALUE STORE
+# --------------------------------------------------
+class SharedCache:
+    def __init__(self, path, namespace: str, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 flights=None):
+        self.path = pathlib.Path(path)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flights = flights or SingleFlight(self.path.parent / "locks")
+
+        self._local = threading.local()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _read(self, key: str):
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value FROM shared_cache "
+            "WHERE namespace = ? AND key = ? AND created_at >= ?",
+            (self.namespace, key, now - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._conn().execute(
+            "UPDATE shared_cache SET last_access = ? WHERE namespace = ? AND key = ?",
+            (now, self.namespace, key)
+        )
+        return row[0]
+
+    def get(self, key: str):
+        value = self._read(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO shared_cache "
+            "(namespace, key, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, value, now, now)
+        )
+
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def get_or_compute(self, key: str, compute):
+        """
+        Cached value for key, or compute() run by exactly one caller across
+        the workers; falsy results are returned but not stored
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self.flights.hold(f"{self.namespace}\x1f{key}"):
+            value = self._read(key)
+            if value is not None:
+                self.coalesced += 1
+                return value
+
+            value = compute()
+            if value:
+                self.put(key, value)
+        return value
+
+    def prune(self):
+        conn = self._conn()
+        conn.execute(
+            "DELETE FROM shared_cache WHERE namespace = ? AND created_at < ?",
+            (self.namespace, time.time() - self.ttl)
+        )
+        conn.execute(
+            "DELETE FROM shared_cache WHERE namespace = ? AND key IN ("
+            "  SELECT key FROM shared_cache WHERE namespace = ?"
+            "  ORDER BY last_access DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        entries = self._conn().execute(
+            "SELECT COUNT(*) FROM shared_cache WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,190 @@
+'''
+Shared cache of speech-to-text results for /check.
+
+Entries are keyed on a hash of the normalized audio (mono 16 kHz, silence
+trimmed) plus the STT language code, so resubmitting the same recording is
+free. Each row also stores an acoustic fingerprint. With
+TRANSCRIPT_FINGERPRINT_MATCH=1 a lookup that misses on the exact hash falls
+back to comparing fingerprints of clips of similar length, so a re-encoded
+copy of an earlier recording reuses its transcript. This is off by default:
+/check is an assessment, and a near miss must not be scored as somebody
+else's take. Fingerprint matches never return seeded reference rows
+(source "tts"), whose transcript is the expected text itself.
+
+Like the phonetic help store this is SQLite in WAL mode, shared by every
+gunicorn worker, with a TTL and an LRU cap on the number of rows. Audio we
+synthesised ourselves, including the pronunciation pack's, is seeded with
+its known text (source "tts").
+'''
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", 50000))
+
+FINGERPRINT_MATCH = os.getenv("TRANSCRIPT_FINGERPRINT_MATCH", "0") == "1"
+# Bit error rate under which two fingerprints count as the same recording.
+# Distinct words in one language are 0.4 or more apart on the reference
+# clips in Data/, and two different words in different languages 0.25, so
+# only near-identical audio passes.
+MATCH_THRESHOLD = 0.05
+# Clips whose fingerprints differ in length by more than this many frames
+# are never compared
+LENGTH_TOLERANCE = 3
+# Short clips have too few bits for a low error rate to mean much (~0.75 s)
+MIN_FINGERPRINT_FRAMES = 24
+
+PRUNE_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    key         TEXT PRIMARY KEY,
+    language    TEXT NOT NULL,
+    frames      INTEGER NOT NULL,
+    fingerprint BLOB NOT NULL,
+    transcript  TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_language_frames
+    ON transcripts (language, frames);
+CREATE INDEX IF NOT EXISTS transcripts_last_access
+    ON transcripts (last_access);
+"""
+
+
+def audio_key(audio: bytes, language: str) -> str:
+    digest = hashlib.sha256(audio)
+    digest.update(b"\x1f" + language.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranscriptStore:
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 fingerprint_match=FINGERPRINT_MATCH):
+        self.path = pathlib.Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fingerprint_match = fingerprint_match
+
+        self._local = threading.local()
+        self._writes = 0
+
+        self.hits = 0
+        self.fingerprint_hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, audio: bytes, fingerprint, language: str):
+        """
+        Cached transcript for the normalized audio, or None. fingerprint is
+        the (bits, frames) pair from audio_prep.fingerprint.
+        """
+        conn = self._conn()
+        now = time.time()
+        key = audio_key(audio, language)
+
+        row = conn.execute(
+            "SELECT transcript FROM transcripts WHERE key = ? AND created_at >= ?",
+            (key, now - self.ttl)
+        ).fetchone()
+        if row is not None:
+            self.hits += 1
+            self._touch(key, now)
+            return row[0]
+
+        bits, frames = fingerprint
+        if self.fingerprint_match and frames >= MIN_FINGERPRINT_FRAMES:
+            from Backend.audio_prep import fingerprint_distance
+
+            candidates = conn.execute(
+                "SELECT key, fingerprint, frames, transcript FROM transcripts "
+                "WHERE language = ? AND frames BETWEEN ? AND ? AND created_at >= ? "
+                "AND source != 'tts'",
+                (language, frames - LENGTH_TOLERANCE, frames + LENGTH_TOLERANCE, now - self.ttl)
+            ).fetchall()
+
+            best = None
+            for candidate_key, candidate_bits, candidate_frames, transcript in candidates:
+                distance = fingerprint_distance(bits, frames, candidate_bits, candidate_frames)
+                if distance <= MATCH_THRESHOLD and (best is None or distance < best[0]):
+                    best = (distance, candidate_key, transcript)
+
+            if best is not None:
+                self.fingerprint_hits += 1
+                self._touch(best[1], now)
+                return best[2]
+
+        self.misses += 1
+        return None
+
+    def put(self, audio: bytes, fingerprint, language: str, transcript: str, source: str = "stt"):
+        bits, frames = fingerprint
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO transcripts "
+            "(key, language, frames, fingerprint, transcript, source, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (audio_key(audio, language), language, frames, bits, transcript, source, now, now)
+        )
+
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def get_or_transcribe(self, audio: bytes, fingerprint, language: str, transcribe) -> str:
+        transcript = self.get(audio, fingerprint, language)
+        if transcript is None:
+            transcript = transcribe()
+            if transcript:
+                self.put(audio, fingerprint, language, transcript)
+        return transcript
+
+    def _touch(self, key, now):
+        self._conn().execute(
+            "UPDATE transcripts SET last_access = ? WHERE key = ?",
+            (now, key)
+        )
+
+    def prune(self):
+        conn = self._conn()
+        conn.execute(
+            "DELETE FROM transcripts WHERE created_at < ?",
+            (time.time() - self.ttl,)
+        )
+        conn.execute(
+            "DELETE FROM transcripts WHERE key IN ("
+            "  SELECT key FROM transcripts ORDER BY last_access DESC"
+            "  LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        hits = self.hits + self.fingerprint_hits
+        lookups = hits + self.misses
+        entries = self._conn().execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "fingerprint_hits": self.fingerprint_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0
+        }
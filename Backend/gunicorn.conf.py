@@ -0,0 +1,24 @@
+# Picked up automatically by gunicorn when started from Backend/ (see Procfile)
+import os
+
+wsgi_app = "app:create_app()"
+
+# Worker processes. The OCR pools (ApiCalls/ocr/ocr_pool.py) size themselves
+# from the same variable, so change WEB_CONCURRENCY rather than passing -w.
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+
+# /check/stream keeps a websocket open for as long as the learner speaks, so
+# workers serve requests from a thread pool instead of one at a time
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+# Import the app and preload its read-only data once in the master; workers
+# are forked from it warm and share those pages copy-on-write
+preload_app = os.getenv("APP_PRELOAD", "1") == "1"
+
+
+def post_fork(server, worker):
+    # A no-op for models the master already preloaded
+    from Backend.ApiCalls.ocr.ocr_engine import prewarm_from_env
+
+    prewarm_from_env()
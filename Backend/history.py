@@ -0,0 +1,225 @@
+'''
+Learner history: every /check attempt, and per-word progress.
+
+Two tables in one SQLite (WAL) file shared by the gunicorn workers:
+
+  attempts    append-only log of (learner, language, word, score, spoken,
+              time), indexed by learner and time for the recent list
+  word_stats  one row per (learner, language, word), updated in the same
+              transaction as each insert: attempt count, total, best and
+              last score, and an exponentially weighted moving average of
+              the score (recent attempts count most)
+
+/history and the "words to practise" list only read word_stats and the
+newest attempts through their indexes, so they stay in the milliseconds no
+matter how many attempts have been logged.
+
+A learner is an opaque id kept in a cookie; there are no accounts.
+'''
+import os
+import pathlib
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+
+LEARNER_COOKIE = "uchaaran_learner"
+LEARNER_COOKIE_MAX_AGE = 2 * 365 * 24 * 3600
+LEARNER_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+# Weight of the newest score in the moving average
+SCORE_ALPHA = 0.3
+# Moving average (out of 10) from which a word counts as mastered; the
+# /check page calls 8 and up "excellent"
+MASTERED_SCORE = 8.0
+
+RECENT_LIMIT = int(os.getenv("HISTORY_RECENT_LIMIT", 20))
+PRACTISE_LIMIT = int(os.getenv("HISTORY_PRACTISE_LIMIT", 10))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id          INTEGER PRIMARY KEY,
+    learner     TEXT NOT NULL,
+    language    TEXT NOT NULL,
+    word        TEXT NOT NULL,
+    score       REAL NOT NULL,
+    spoken      TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_learner_created
+    ON attempts (learner, created_at);
+
+CREATE TABLE IF NOT EXISTS word_stats (
+    learner     TEXT NOT NULL,
+    language    TEXT NOT NULL,
+    word        TEXT NOT NULL,
+    attempts    INTEGER NOT NULL,
+    total_score REAL NOT NULL,
+    best_score  REAL NOT NULL,
+    last_score  REAL NOT NULL,
+    avg_score   REAL NOT NULL,
+    first_at    REAL NOT NULL,
+    last_at     REAL NOT NULL,
+    PRIMARY KEY (learner, language, word)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS word_stats_learner_avg
+    ON word_stats (learner, avg_score);
+CREATE INDEX IF NOT EXISTS word_stats_learner_last
+    ON word_stats (learner, last_at);
+"""
+
+UPSERT = """
+INSERT INTO word_stats (
+    learner, language, word, attempts, total_score, best_score, last_score,
+    avg_score, first_at, last_at
+) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (learner, language, word) DO UPDATE SET
+    attempts = attempts + 1,
+    total_score = total_score + excluded.last_score,
+    best_score = MAX(best_score, excluded.last_score),
+    last_score = excluded.last_score,
+    avg_score = avg_score + {alpha} * (excluded.last_score - avg_score),
+    last_at = excluded.last_at
+""".format(alpha=SCORE_ALPHA)
+
+WORD_COLUMNS = "language, word, attempts, best_score, last_score, avg_score, last_at"
+
+
+def new_learner_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def valid_learner_id(value) -> bool:
+    return bool(value) and LEARNER_ID.match(value) is not None
+
+
+def _word_row(row) -> dict:
+    language, word, attempts, best, last, average, last_at = row
+    return {
+        "language": language,
+        "word": word,
+        "attempts": attempts,
+        "best_score": best,
+        "last_score": last,
+        "average_score": round(average, 1),
+        "last_at": last_at
+    }
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self._local = threading.local()
+
+        self.recorded = 0
+        self.failed = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --------------------------------------------------
+    # WRITES
+    # --------------------------------------------------
+    def record(self, learner: str, word: str, language: str, score: float, spoken: str = "",
+               at: float = None):
+        """
+        Logs one attempt and folds it into the word's aggregates. Never
+        raises: a history failure must not cost the learner their score.
+        """
+        at = time.time() if at is None else at
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO attempts (learner, language, word, score, spoken, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (learner, language, word, score, spoken, at)
+                )
+                conn.execute(UPSERT, (learner, language, word, score, score, score, score, at, at))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        except (sqlite3.Error, OSError) as e:
+            print("History record error:", e)
+            self.failed += 1
+            return
+
+        self.recorded += 1
+
+    # --------------------------------------------------
+    # READS
+    # --------------------------------------------------
+    def recent(self, learner: str, limit: int = RECENT_LIMIT) -> list:
+        rows = self._conn().execute(
+            "SELECT language, word, score, spoken, created_at FROM attempts "
+            "WHERE learner = ? ORDER BY created_at DESC LIMIT ?",
+            (learner, limit)
+        ).fetchall()
+        return [
+            {"language": language, "word": word, "score": score, "spoken": spoken, "at": at}
+            for language, word, score, spoken, at in rows
+        ]
+
+    def to_practise(self, learner: str, limit: int = PRACTISE_LIMIT) -> list:
+        """
+        Words not yet mastered, weakest moving average first
+        """
+        rows = self._conn().execute(
+            f"SELECT {WORD_COLUMNS} FROM word_stats "
+            "WHERE learner = ? AND avg_score < ? ORDER BY avg_score, last_at LIMIT ?",
+            (learner, MASTERED_SCORE, limit)
+        ).fetchall()
+        return [_word_row(row) for row in rows]
+
+    def words(self, learner: str, limit: int = RECENT_LIMIT) -> list:
+        """
+        Per-word progress, most recently practised first
+        """
+        rows = self._conn().execute(
+            f"SELECT {WORD_COLUMNS} FROM word_stats "
+            "WHERE learner = ? ORDER BY last_at DESC LIMIT ?",
+            (learner, limit)
+        ).fetchall()
+        return [_word_row(row) for row in rows]
+
+    def summary(self, learner: str) -> dict:
+        words, attempts, total, mastered = self._conn().execute(
+            "SELECT COUNT(*), SUM(attempts), SUM(total_score), SUM(avg_score >= ?) "
+            "FROM word_stats WHERE learner = ?",
+            (MASTERED_SCORE, learner)
+        ).fetchone()
+        return {
+            "words": words,
+            "attempts": attempts or 0,
+            "mastered": mastered or 0,
+            "average_score": round(total / attempts, 1) if attempts else None
+        }
+
+    def history(self, learner: str) -> dict:
+        """
+        Everything the /history page shows
+        """
+        return {
+            "summary": self.summary(learner),
+            "to_practise": self.to_practise(learner),
+            "words": self.words(learner),
+            "recent": self.recent(learner)
+        }
+
+    def stats(self) -> dict:
+        return {
+            "recorded": self.recorded,
+            "failed": self.failed
+        }
@@ -0,0 +1,306 @@
+'''
+Background jobs with results delivered stage by stage.
+
+A job runs on this process's thread pool, but its state and every stage it
+reports live in SQLite (WAL), so the POST that created it, a later poll and
+an SSE stream may each be served by a different gunicorn worker. No broker
+is involved.
+
+    job_id = jobs.submit("learn", fn, *args)   fn(emit, *args) -> result dict
+    emit("how_to_say", {...})                  from inside fn, per stage
+    jobs.get(job_id)                           status + stages so far
+    jobs.events(job_id, after=seq)             [(seq, stage, data)] for SSE
+    jobs.wait(job_id, jobs.version, timeout)   until something may have changed
+'''
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 64))
+JOB_TTL = int(os.getenv("JOB_TTL", 3600))
+
+# A queued or running job with no sign of life for this long lost the
+# process that accepted it (restart / crash). That process refreshes
+# updated_at on all of its unfinished jobs every JOB_HEARTBEAT seconds, so a
+# slow stage or a long queue is not mistaken for a dead worker.
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", 120))
+JOB_HEARTBEAT = JOB_STALE_AFTER / 4
+
+# How often wait() re-reads SQLite for a job that another process is running
+# (its progress cannot be signalled across processes)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 0.25))
+
+PRUNE_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    result      TEXT,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id      TEXT NOT NULL,
+    seq         INTEGER NOT NULL,
+    stage       TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+FINISHED = ("done", "failed")
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class JobQueue:
+    def __init__(self, path, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl=JOB_TTL):
+        self.path = pathlib.Path(path)
+        self.ttl = ttl
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._local = threading.local()
+        self._writes = 0
+
+        # Unfinished jobs accepted by this process; kept alive by _heartbeat
+        self._jobs_here = set()
+        self._heartbeat_thread = None
+        # Bumped and broadcast whenever one of those jobs records something
+        self._changed = threading.Condition()
+        self.version = 0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --------------------------------------------------
+    # PRODUCER
+    # --------------------------------------------------
+    def submit(self, kind: str, fn, *args) -> str:
+        """
+        Queues fn(emit, *args) and returns the job id straight away. Raises
+        JobQueueFull once max_pending jobs are queued or running here.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise JobQueueFull("Too many jobs in progress")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            self._conn().execute(
+                "INSERT INTO jobs (id, kind, status, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, now, now)
+            )
+            with self._changed:
+                self._jobs_here.add(job_id)
+                self._start_heartbeat()
+            self._executor.submit(self._run, job_id, fn, args)
+        except BaseException:
+            with self._changed:
+                self._jobs_here.discard(job_id)
+            self._slots.release()
+            raise
+
+        self.submitted += 1
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        seq = 0
+        lock = threading.Lock()
+
+        def emit(stage, data):
+            # Stages may be reported from the job's own helper threads
+            nonlocal seq
+            with lock:
+                seq += 1
+                self._conn().execute(
+                    "INSERT INTO job_events (job_id, seq, stage, data, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (job_id, seq, stage, json.dumps(data, ensure_ascii=False), time.time())
+                )
+                self._touch(job_id)
+            self._notify()
+
+        try:
+            self._set_status(job_id, "running")
+            result = fn(emit, *args)
+        except Exception as e:
+            print(f"Job {job_id} failed:", e)
+            self.failed += 1
+            self._finish(job_id, "failed", error=str(e) or type(e).__name__)
+        else:
+            self._finish(job_id, "done", result=result)
+        finally:
+            with self._changed:
+                self._jobs_here.discard(job_id)
+            self._notify()
+            self._slots.release()
+
+    def _set_status(self, job_id, status):
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+            (status, time.time(), job_id)
+        )
+        self._notify()
+
+    def _touch(self, job_id):
+        self._conn().execute(
+            "UPDATE jobs SET updated_at = ? WHERE id = ?",
+            (time.time(), job_id)
+        )
+
+    def _notify(self):
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def _start_heartbeat(self):
+        # Called with self._changed held. Started on first use rather than in
+        # __init__ so a preloading gunicorn master forks no thread.
+        if self._heartbeat_thread is None:
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat, name="job-heartbeat", daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(JOB_HEARTBEAT)
+            with self._changed:
+                job_ids = list(self._jobs_here)
+            if not job_ids:
+                continue
+            try:
+                self._conn().execute(
+                    "UPDATE jobs SET updated_at = ? WHERE status IN ('queued', 'running') "
+                    f"AND id IN ({', '.join('?' * len(job_ids))})",
+                    (time.time(), *job_ids)
+                )
+            except sqlite3.Error as e:
+                print("Job heartbeat error:", e)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (
+                status,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                error,
+                time.time(),
+                job_id
+            )
+        )
+
+    # --------------------------------------------------
+    # CONSUMERS
+    # --------------------------------------------------
+    def status(self, job_id: str):
+        """
+        "queued" / "running" / "done" / "failed", or None for an unknown or
+        expired job. An unfinished job whose heartbeat stopped counts as
+        failed: the process that accepted it is gone.
+        """
+        row = self._conn().execute(
+            "SELECT status, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        status, updated_at = row
+        if status not in FINISHED and time.time() - updated_at > JOB_STALE_AFTER:
+            return "failed"
+        return status
+
+    def get(self, job_id: str):
+        row = self._conn().execute(
+            "SELECT kind, result, error, created_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        kind, result, error, created_at = row
+        status = self.status(job_id)
+        if status == "failed" and error is None:
+            error = "Job stopped responding"
+
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "stages": {stage: data for _, stage, data in self.events(job_id)},
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at
+        }
+
+    def events(self, job_id: str, after: int = 0) -> list:
+        rows = self._conn().execute(
+            "SELECT seq, stage, data FROM job_events "
+            "WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after)
+        ).fetchall()
+        return [(seq, stage, json.loads(data)) for seq, stage, data in rows]
+
+    def wait(self, job_id: str, seen: int, timeout: float):
+        """
+        Returns once the job may have moved on since self.version was seen,
+        or after timeout. A job running in this process wakes its waiters
+        directly; one running elsewhere is re-read every JOB_POLL_INTERVAL.
+        """
+        with self._changed:
+            if job_id in self._jobs_here:
+                self._changed.wait_for(lambda: self.version != seen, timeout)
+                return
+        time.sleep(min(timeout, JOB_POLL_INTERVAL))
+
+    # --------------------------------------------------
+    # HOUSEKEEPING
+    # --------------------------------------------------
+    def prune(self):
+        conn = self._conn()
+        cutoff = time.time() - self.ttl
+        conn.execute(
+            "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE created_at < ?)",
+            (cutoff,)
+        )
+        conn.execute("DELETE FROM jobs WHERE created_at < ?", (cutoff,))
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "failed": self.failed
+        }
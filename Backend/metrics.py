@@ -0,0 +1,238 @@
+'''
+Lightweight timing / counters with a Prometheus text exposition.
+
+    @timed("tts")                   latency histogram + error counter
+    with timer("ocr"): ...          same, for a block
+    register_collector(fn)          fn() -> [(name, type, help, labels, value)]
+
+Metrics are kept per process; with several gunicorn workers each scrape of
+/metrics reports the worker that served it. Set METRICS_ENABLED=0 to turn
+everything off: timed() then returns the undecorated function and timer()
+is a no-op context manager.
+'''
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+PREFIX = "uchaaran_"
+
+# Seconds; spans a cached lookup up to a slow LLM / TTS round-trip
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._collectors = []
+
+    def observe(self, name, labels, value, help_text=""):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._help.setdefault(name, help_text)
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1, help_text=""):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._help.setdefault(name, help_text)
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            help_texts = dict(self._help)
+
+        seen = set()
+
+        def header(name, kind, help_text):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for (name, labels), h in histograms:
+            header(name, "histogram", help_texts.get(name, ""))
+            cumulative = 0
+            for bound, count in zip((*h.buckets, "+Inf"), h.counts):
+                cumulative += count
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {h.sum:.6f}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {h.count}")
+
+        for (name, labels), value in counters:
+            header(name, "counter", help_texts.get(name, ""))
+            lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+
+        # Samples of one metric must be contiguous, so group across collectors
+        collected = {}
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                print("Metrics collector error:", e)
+                continue
+            for name, kind, help_text, labels, value in samples:
+                _, _, rows = collected.setdefault(name, (kind, help_text, []))
+                rows.append(f"{PREFIX}{name}{_labels(tuple(sorted(labels.items())))} {value}")
+
+        for name, (kind, help_text, rows) in collected.items():
+            header(name, kind, help_text)
+            lines.extend(rows)
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+registry = Registry()
+
+
+# --------------------------------------------------
+# PUBLIC API
+# --------------------------------------------------
+def observe_call(function, seconds, ok=True):
+    registry.observe(
+        "function_duration_seconds", {"function": function}, seconds,
+        "Latency of instrumented hot-path functions"
+    )
+    if not ok:
+        registry.inc(
+            "function_errors_total", {"function": function},
+            help_text="Exceptions raised by instrumented functions"
+        )
+
+
+def timed(function):
+    """
+    Decorator recording latency and errors under the given function name
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                observe_call(function, time.perf_counter() - start, ok=False)
+                raise
+            observe_call(function, time.perf_counter() - start)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+@contextlib.contextmanager
+def _timer(function):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe_call(function, time.perf_counter() - start, ok=False)
+        raise
+    observe_call(function, time.perf_counter() - start)
+
+
+def timer(function):
+    if not ENABLED:
+        return contextlib.nullcontext()
+    return _timer(function)
+
+
+def observe_request(endpoint, method, status, seconds):
+    if not ENABLED:
+        return
+    registry.observe(
+        "http_request_duration_seconds", {"endpoint": endpoint, "method": method}, seconds,
+        "Flask route latency"
+    )
+    registry.inc(
+        "http_requests_total", {"endpoint": endpoint, "method": method, "status": status},
+        help_text="Flask responses by route and status"
+    )
+
+
+def observe_external(dependency, endpoint, seconds, ok):
+    if not ENABLED:
+        return
+    registry.observe(
+        "external_call_duration_seconds", {"dependency": dependency, "endpoint": endpoint}, seconds,
+        "Latency of each attempt against an external API"
+    )
+    if not ok:
+        registry.inc(
+            "external_call_errors_total", {"dependency": dependency, "endpoint": endpoint},
+            help_text="Failed attempts against an external API"
+        )
+
+
+def cache_samples(cache_name, stats):
+    """
+    Collector samples for a cache exposing hits / misses in stats()
+    """
+    labels = {"cache": cache_name}
+    samples = [
+        ("cache_hits_total", "counter", "Cache hits", labels, stats["hits"]),
+        ("cache_misses_total", "counter", "Cache misses", labels, stats["misses"]),
+        ("cache_hit_ratio", "gauge", "Cache hit ratio since start", labels, stats["hit_ratio"]),
+    ]
+    if "entries" in stats:
+        samples.append(("cache_entries", "gauge", "Entries currently cached", labels, stats["entries"]))
+    if "coalesced" in stats:
+        samples.append((
+            "cache_coalesced_total", "counter",
+            "Misses answered by another worker's in-flight computation", labels, stats["coalesced"]
+        ))
+    return samples
+
+
+def register_collector(collector):
+    if ENABLED:
+        registry.register_collector(collector)
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,300 @@
+'''
+Precomputed pronunciation pack for the curated words.
+
+The pack is one versioned file built offline: a small header, a JSON index
+and a blob of concatenated wavs. For each word it records the native script
+text, the phonetic explanation and the reference audio, so the demo words
+behind /learn/<word> (and any curated list) are answered with no API call
+and a cold deploy starts warm. The app memory-maps the file at startup;
+audio is served straight out of the mapping and every gunicorn worker
+shares the same pages. Each worker's first request also seeds the reference
+audio into the transcript store (once per pack build, see
+app.seed_pack_transcripts), so checking against it costs no STT call.
+
+    python -m Backend.pronunciation_pack
+    python -m Backend.pronunciation_pack --words Data/words.tsv --out Data/pronunciation.pack
+
+Word lists are "<word><TAB><Language>" per line; WORD_LANGUAGE_MAP is always
+included. Building needs SARVAM_API_KEY. A pack built for another TTS voice
+or phonetic prompt version is ignored at load time.
+
+Layout:
+
+    magic "UCPK" | u16 format version | u32 index length | index | audio blob
+'''
+import argparse
+import json
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+import time
+
+from Backend.cache.audio import cache_key, normalize_text
+
+
+MAGIC = b"UCPK"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHI")
+
+DEFAULT_PATH = pathlib.Path(__file__).resolve().parent.parent / "Data" / "pronunciation.pack"
+PACK_PATH = pathlib.Path(os.getenv("PRONUNCIATION_PACK", DEFAULT_PATH))
+
+
+def input_key(text: str) -> str:
+    return normalize_text(text).lower()
+
+
+# --------------------------------------------------
+# READER
+# --------------------------------------------------
+class PronunciationPack:
+    def __init__(self, path, voice: str, prompt_version: str):
+        self.path = pathlib.Path(path)
+        self.voice = voice
+        self.prompt_version = prompt_version
+
+        self._mmap = None
+        self._blob_start = 0
+        self._words = {}
+        self._entries = {}
+        self.built_at = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> bool:
+        """
+        Maps the pack if it exists and matches this app's voice and prompt
+        version; returns whether it is in use
+        """
+        if not self.path.is_file():
+            return False
+
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, version, index_length = HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"unsupported pack format (version {version})")
+
+            index = json.loads(mapped[HEADER.size:HEADER.size + index_length])
+        except (OSError, ValueError, struct.error) as e:
+            print("Pronunciation pack not loaded:", e)
+            return False
+
+        if index["voice"] != self.voice or index["prompt_version"] != self.prompt_version:
+            print(
+                "Pronunciation pack not loaded: built for voice "
+                f"{index['voice']!r} / prompt {index['prompt_version']!r}, rebuild it"
+            )
+            mapped.close()
+            return False
+
+        self._mmap = mapped
+        self._blob_start = HEADER.size + index_length
+        self._words = index["words"]
+        self._entries = index["entries"]
+        self.built_at = index["built_at"]
+        return True
+
+    @property
+    def loaded(self) -> bool:
+        return self._mmap is not None
+
+    def native(self, text_input: str, language: str):
+        """
+        Native script text the pack recorded for a typed word, or None
+        """
+        return self._words.get(language, {}).get(input_key(text_input))
+
+    def contains(self, text: str, language: str) -> bool:
+        return cache_key(text, language, self.voice) in self._entries
+
+    def lookup(self, text: str, language: str):
+        """
+        {"how_to_say", "pronunciation_audio"} for native text, or None
+        """
+        key = cache_key(text, language, self.voice)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {
+            "how_to_say": entry["how_to_say"],
+            "pronunciation_audio": f"{key}.{entry['ext']}"
+        }
+
+    def audio(self, filename: str):
+        """
+        (memoryview of the audio bytes, extension) for a pack filename, or None
+        """
+        key, _, ext = filename.rpartition(".")
+        entry = self._entries.get(key)
+        if entry is None or entry["ext"] != ext:
+            return None
+
+        offset, length = entry["audio"]
+        start = self._blob_start + offset
+        return memoryview(self._mmap)[start:start + length], ext
+
+    def references(self):
+        """
+        (native text, language, memoryview of the audio) for every entry
+        """
+        for entry in self._entries.values():
+            offset, length = entry["audio"]
+            start = self._blob_start + offset
+            yield entry["text"], entry["language"], memoryview(self._mmap)[start:start + length]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+# --------------------------------------------------
+# WRITER
+# --------------------------------------------------
+def write_pack(path, records, voice: str, prompt_version: str):
+    """
+    records: dicts with input, language, text, how_to_say, audio (bytes) and
+    ext. Written to a temp file and renamed so a running app that has the
+    old pack mapped is unaffected.
+    """
+    path = pathlib.Path(path)
+    words = {}
+    entries = {}
+    blobs = []
+    offset = 0
+
+    for record in records:
+        words.setdefault(record["language"], {})[input_key(record["input"])] = record["text"]
+
+        key = cache_key(record["text"], record["language"], voice)
+        if key in entries:
+            continue
+
+        entries[key] = {
+            "text": record["text"],
+            "language": record["language"],
+            "how_to_say": record["how_to_say"],
+            "ext": record["ext"],
+            "audio": [offset, len(record["audio"])]
+        }
+        blobs.append(record["audio"])
+        offset += len(record["audio"])
+
+    index = json.dumps({
+        "built_at": time.time(),
+        "voice": voice,
+        "prompt_version": prompt_version,
+        "words": words,
+        "entries": entries
+    }, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".pack-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(index)))
+            f.write(index)
+            for blob in blobs:
+                f.write(blob)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return len(entries), offset
+
+
+# --------------------------------------------------
+# BUILDER
+# --------------------------------------------------
+def read_word_list(path) -> list:
+    words = []
+    for line in pathlib.Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        word, _, language = line.partition("\t")
+        words.append((word.strip(), language.strip()))
+    return words
+
+
+def build(out, word_lists=()) -> int:
+    # The live pipeline (and its caches) produces the pack, so packed
+    # answers are exactly what /learn would have returned
+    from Backend import app
+
+    items = [(word, language) for word, language in app.WORD_LANGUAGE_MAP.items()]
+    for path in word_lists:
+        items += read_word_list(path)
+    items = list(dict.fromkeys(items))
+
+    unknown = [word for word, language in items if language not in app.GOOGLE_LANG_MAP]
+    if unknown:
+        print("Unsupported language for:", ", ".join(unknown))
+        return 1
+
+    records = []
+    failed = []
+    for (word, language), result in zip(items, app.process_learn_batch(items)):
+        if result["errors"] or not result["how_to_say"] or not result["pronunciation_audio"]:
+            failed.append(word)
+            continue
+
+        # Served from an older pack or the local audio cache
+        filename = result["pronunciation_audio"]
+        packed = app.pronunciation_pack.audio(filename)
+        if packed is not None:
+            data = packed[0]
+        else:
+            key, _, ext = filename.rpartition(".")
+            data = app.audio_cache.get(key, ext)
+            if data is None:
+                failed.append(word)
+                continue
+            data = data.read_bytes()
+
+        records.append({
+            "input": word,
+            "language": language,
+            "text": result["text"],
+            "how_to_say": result["how_to_say"],
+            "audio": bytes(data),
+            "ext": filename.rpartition(".")[2]
+        })
+
+    entries, size = write_pack(out, records, app.TTS_VOICE, app.PHONETIC_PROMPT_VERSION)
+    print(f"Wrote {out}: {len(records)} words, {entries} entries, {size / 1024:.0f} KB of audio")
+
+    if failed:
+        print("Not packed (retry later):", ", ".join(failed))
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed pronunciation pack")
+    parser.add_argument("--out", type=pathlib.Path, default=PACK_PATH)
+    parser.add_argument("--words", type=pathlib.Path, action="append", default=[],
+                        help="extra word list, <word><TAB><Language> per line")
+    args = parser.parse_args()
+
+    sys.exit(build(args.out, args.words))
+
+
+if __name__ == "__main__":
+    main()
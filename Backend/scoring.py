@@ -0,0 +1,469 @@
+'''
+Local pronunciation scoring.
+
+Both the expected word and the STT transcript are brought to one phonetic
+representation (ISO 15919 phonemes) whatever script they arrive in: native
+Indic text is shifted onto the parallel Devanagari block and transliterated
+with indic_transliteration, casual English spelling goes through ITRANS. The
+phoneme sequences are then aligned with a weighted edit distance whose
+substitution costs come from articulatory features (place, manner, voicing,
+aspiration, vowel length) and are precomputed once at import, and the
+alignment is folded back onto the expected word's aksharas to give a
+per-syllable diff. Text with no letters to score (digits, punctuation) is
+compared as written instead, with no syllable diff.
+
+    score_pronunciation("വിഴിഞ്ഞം", "ബിസിംഗം", "Malayalam")
+    -> {"score": 6.2, "syllables": [{"expected": "vi", "spoken": "bi", ...}, ...]}
+'''
+import difflib
+import functools
+import re
+import unicodedata
+
+from indic_transliteration import sanscript
+
+from Backend.transliteration import CASUAL_ITRANS
+
+
+# --------------------------------------------------
+# SCRIPTS
+# --------------------------------------------------
+DEVANAGARI_BASE = 0x0900
+BLOCK_SIZE = 0x80
+
+# Unicode blocks laid out in parallel with Devanagari (ISCII heritage), so a
+# fixed offset maps e.g. Tamil க onto क. Going through Devanagari also avoids
+# sanscript's direct Tamil table, which voices and aspirates every stop.
+INDIC_BLOCKS = {
+    0x0900: "Devanagari",
+    0x0980: "Bengali",
+    0x0A00: "Gurmukhi",
+    0x0A80: "Gujarati",
+    0x0B00: "Oriya",
+    0x0B80: "Tamil",
+    0x0C00: "Telugu",
+    0x0C80: "Kannada",
+    0x0D00: "Malayalam",
+}
+
+# Letters with no Devanagari counterpart, rewritten before the shift
+NATIVE_REWRITES = (
+    ("\u0D7A", "\u0D23\u0D4D"),  # Malayalam chillu nn -> ണ്
+    ("\u0D7B", "\u0D28\u0D4D"),  # chillu n  -> ന്
+    ("\u0D7C", "\u0D30\u0D4D"),  # chillu rr -> ര്
+    ("\u0D7D", "\u0D32\u0D4D"),  # chillu l  -> ല്
+    ("\u0D7E", "\u0D33\u0D4D"),  # chillu ll -> ള്
+    ("\u0D7F", "\u0D15\u0D4D"),  # chillu k  -> ക്
+    ("\u09CE", "\u09A4\u09CD"),  # Bengali khanda ta -> ত্
+    ("\u0A70", "\u0A02"),        # Gurmukhi tippi -> bindi
+    ("\u200C", ""),              # ZWNJ
+    ("\u200D", ""),              # ZWJ (old-style chillus)
+)
+
+# Gurmukhi addak doubles the following consonant
+ADDAK = re.compile("\u0A71([\u0A15-\u0A39])")
+
+# Languages that drop the inherent vowel at the end of a word
+FINAL_SCHWA_DELETION = {"Hindi", "Marathi", "Punjabi", "Gujarati", "Bengali"}
+
+# Tamil script does not mark voicing or aspiration, so neither is scored
+TAMIL_FOLD = {
+    "kh": "k", "g": "k", "gh": "k",
+    "ch": "c", "j": "c", "jh": "c",
+    "ṭh": "ṭ", "ḍ": "ṭ", "ḍh": "ṭ",
+    "th": "t", "d": "t", "dh": "t",
+    "ph": "p", "b": "p", "bh": "p",
+}
+
+
+# --------------------------------------------------
+# PHONEME INVENTORY
+# --------------------------------------------------
+# vowel -> (quality, long)
+VOWELS = {
+    "a": ("a", 0), "ā": ("a", 1),
+    "i": ("i", 0), "ī": ("i", 1),
+    "u": ("u", 0), "ū": ("u", 1),
+    "e": ("e", 0), "ē": ("e", 1), "ê": ("e", 0), "ai": ("ai", 1),
+    "o": ("o", 0), "ō": ("o", 1), "ô": ("o", 0), "au": ("au", 1),
+    "r̥": ("r̥", 0), "r̥̄": ("r̥", 1),
+    "l̥": ("l̥", 0), "l̥̄": ("l̥", 1),
+}
+
+# Vowel qualities that are commonly confused
+NEAR_VOWELS = {
+    frozenset(("e", "ai")), frozenset(("o", "au")),
+    frozenset(("e", "i")), frozenset(("o", "u")),
+    frozenset(("a", "ai")), frozenset(("a", "au")),
+    frozenset(("r̥", "i")), frozenset(("r̥", "u")),
+}
+
+# consonant -> (place, manner, voiced, aspirated)
+CONSONANTS = {
+    "k": ("velar", "stop", 0, 0), "kh": ("velar", "stop", 0, 1),
+    "g": ("velar", "stop", 1, 0), "gh": ("velar", "stop", 1, 1),
+    "ṅ": ("velar", "nasal", 1, 0),
+    "c": ("palatal", "stop", 0, 0), "ch": ("palatal", "stop", 0, 1),
+    "j": ("palatal", "stop", 1, 0), "jh": ("palatal", "stop", 1, 1),
+    "ñ": ("palatal", "nasal", 1, 0),
+    "ṭ": ("retroflex", "stop", 0, 0), "ṭh": ("retroflex", "stop", 0, 1),
+    "ḍ": ("retroflex", "stop", 1, 0), "ḍh": ("retroflex", "stop", 1, 1),
+    "ṇ": ("retroflex", "nasal", 1, 0),
+    "t": ("dental", "stop", 0, 0), "th": ("dental", "stop", 0, 1),
+    "d": ("dental", "stop", 1, 0), "dh": ("dental", "stop", 1, 1),
+    "n": ("dental", "nasal", 1, 0), "ṉ": ("alveolar", "nasal", 1, 0),
+    "p": ("labial", "stop", 0, 0), "ph": ("labial", "stop", 0, 1),
+    "b": ("labial", "stop", 1, 0), "bh": ("labial", "stop", 1, 1),
+    "m": ("labial", "nasal", 1, 0),
+    "y": ("palatal", "approximant", 1, 0), "v": ("labial", "approximant", 1, 0),
+    "ẏ": ("palatal", "approximant", 1, 0),
+    "r": ("alveolar", "rhotic", 1, 0), "ṟ": ("alveolar", "rhotic", 1, 0),
+    "ṛ": ("retroflex", "rhotic", 1, 0), "ṛh": ("retroflex", "rhotic", 1, 1),
+    "l": ("dental", "lateral", 1, 0), "ḷ": ("retroflex", "lateral", 1, 0),
+    "ḻ": ("retroflex", "approximant", 1, 0),
+    "ś": ("palatal", "fricative", 0, 0), "ṣ": ("retroflex", "fricative", 0, 0),
+    "s": ("dental", "fricative", 0, 0), "h": ("glottal", "fricative", 1, 0),
+    "q": ("velar", "stop", 0, 0), "k͟h": ("velar", "fricative", 0, 0),
+    "ġ": ("velar", "fricative", 1, 0),
+    "z": ("dental", "fricative", 1, 0), "f": ("labial", "fricative", 0, 0),
+}
+
+# Anusvara / candrabindu / visarga, scored as a light coda
+MARKS = {"ṁ", "m̐", "ḥ"}
+
+CORONAL = {"dental", "alveolar", "retroflex"}
+
+# Pairs that learners (and STT) swap far more often than features suggest
+CONFUSABLE = {
+    frozenset(("v", "b")): 0.3,
+    frozenset(("ph", "f")): 0.15,
+    frozenset(("j", "z")): 0.3,
+    frozenset(("ṛ", "ḍ")): 0.2,
+    frozenset(("ṛ", "r")): 0.25,
+    frozenset(("ḻ", "ḷ")): 0.2,
+    frozenset(("ḻ", "l")): 0.3,
+    frozenset(("ḻ", "ḍ")): 0.4,
+    frozenset(("ḻ", "z")): 0.4,
+    frozenset(("ḥ", "h")): 0.3,
+    frozenset(("ṁ", "m̐")): 0.1,
+    frozenset(("v", "ẏ")): 0.5,
+    frozenset(("y", "ẏ")): 0.1,
+}
+
+INDEL_COST = 1.0
+# Inherent vowels, nasal / visarga marks and doubled consonants are the
+# usual casualties of casual spelling and fast speech
+LIGHT_INDEL_COST = 0.5
+LIGHT_INDELS = {"a"} | MARKS
+
+# A syllable is "close" while its aligned cost stays under one full phoneme
+CLOSE_COST = 1.0
+
+PHONEMES = tuple(VOWELS) + tuple(CONSONANTS) + tuple(MARKS)
+
+# Longest spellings first so "kh" wins over "k" + "h"
+_TOKEN = re.compile(
+    "|".join(re.escape(p) for p in sorted(PHONEMES, key=len, reverse=True))
+    + r"|[^\W\d_]"
+)
+
+
+def _consonant_cost(a: str, b: str) -> float:
+    place_a, manner_a, voiced_a, asp_a = CONSONANTS[a]
+    place_b, manner_b, voiced_b, asp_b = CONSONANTS[b]
+    feature_cost = 0.25 * (voiced_a != voiced_b) + 0.15 * (asp_a != asp_b)
+
+    if manner_a == manner_b and place_a == place_b:
+        return max(0.1, feature_cost)
+    if manner_a == manner_b == "nasal":
+        return 0.3
+    if manner_a == manner_b:
+        near = place_a in CORONAL and place_b in CORONAL
+        return min(0.9, (0.3 if near else 0.6) + feature_cost)
+    if place_a == place_b:
+        return min(0.9, 0.5 + feature_cost)
+    return 1.0
+
+
+def _substitution_cost(a: str, b: str) -> float:
+    if a == b:
+        return 0.0
+
+    pair = frozenset((a, b))
+    if pair in CONFUSABLE:
+        return CONFUSABLE[pair]
+
+    if a in VOWELS and b in VOWELS:
+        (quality_a, long_a), (quality_b, long_b) = VOWELS[a], VOWELS[b]
+        if quality_a == quality_b:
+            return 0.2
+        return 0.5 if frozenset((quality_a, quality_b)) in NEAR_VOWELS else 0.8
+
+    if a in CONSONANTS and b in CONSONANTS:
+        return _consonant_cost(a, b)
+
+    # An anusvara sounds like whichever nasal it stands for
+    if a in MARKS and b in CONSONANTS or b in MARKS and a in CONSONANTS:
+        consonant = a if a in CONSONANTS else b
+        mark = b if consonant == a else a
+        if mark != "ḥ" and CONSONANTS[consonant][1] == "nasal":
+            return 0.15
+
+    return 1.0
+
+
+SUBSTITUTION = {
+    (a, b): _substitution_cost(a, b)
+    for a in PHONEMES
+    for b in PHONEMES
+}
+
+
+# --------------------------------------------------
+# NORMALIZATION
+# --------------------------------------------------
+def _block(char: str):
+    base = ord(char) & ~(BLOCK_SIZE - 1)
+    return base if base in INDIC_BLOCKS else None
+
+
+def _native_to_iso(text: str) -> str:
+    for old, new in NATIVE_REWRITES:
+        text = text.replace(old, new)
+    text = ADDAK.sub("\\1\u0A4D\\1", text)
+
+    shifted = "".join(
+        chr(ord(c) - _block(c) + DEVANAGARI_BASE) if _block(c) else c
+        for c in text
+    )
+    return sanscript.transliterate(shifted, sanscript.DEVANAGARI, sanscript.ISO)
+
+
+def _latin_to_iso(text: str) -> str:
+    itrans = re.sub(r"[^a-z\s]", " ", text.lower())
+    for casual, canonical in CASUAL_ITRANS:
+        itrans = itrans.replace(casual, canonical)
+    return sanscript.transliterate(itrans, sanscript.ITRANS, sanscript.ISO)
+
+
+def to_iso(text: str) -> str:
+    """
+    ISO 15919 romanization of text in any supported Indic script or in
+    casual English spelling; runs of different scripts are converted
+    separately.
+    """
+    text = unicodedata.normalize("NFC", text)
+    runs = re.findall(r"[\u0900-\u0DFF\u200C\u200D]+|[^\u0900-\u0DFF]+", text)
+    return "".join(
+        _native_to_iso(run) if _block(run[0]) or run[0] in "\u200C\u200D" else _latin_to_iso(run)
+        for run in runs
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def to_phonemes(text: str, language: str = None) -> tuple:
+    """
+    Tuple of words, each a tuple of phonemes
+    """
+    words = []
+    for word in to_iso(text).split():
+        phonemes = _TOKEN.findall(unicodedata.normalize("NFC", word))
+        if not phonemes:
+            continue
+
+        if language == "Tamil":
+            phonemes = [TAMIL_FOLD.get(p, p) for p in phonemes]
+        if (language in FINAL_SCHWA_DELETION and len(phonemes) > 1
+                and phonemes[-1] == "a" and phonemes[-2] in CONSONANTS):
+            phonemes = phonemes[:-1]
+
+        words.append(tuple(phonemes))
+    return tuple(words)
+
+
+def syllabify(phonemes) -> list:
+    """
+    Splits one word's phonemes into aksharas: consonant onset + vowel, with
+    trailing marks and word-final consonants kept as a coda. Returns
+    (start, end) index pairs.
+    """
+    bounds = []
+    start = 0
+    i = 0
+    while i < len(phonemes):
+        if phonemes[i] in VOWELS:
+            end = i + 1
+            while end < len(phonemes) and phonemes[end] in MARKS:
+                end += 1
+            bounds.append([start, end])
+            start = i = end
+            continue
+        i += 1
+
+    if start < len(phonemes):
+        if bounds:
+            bounds[-1][1] = len(phonemes)
+        else:
+            bounds.append([start, len(phonemes)])
+    return [tuple(b) for b in bounds]
+
+
+# --------------------------------------------------
+# ALIGNMENT
+# --------------------------------------------------
+def _indel_costs(phonemes) -> list:
+    costs = []
+    for i, p in enumerate(phonemes):
+        doubled = (i > 0 and phonemes[i - 1] == p) or (i + 1 < len(phonemes) and phonemes[i + 1] == p)
+        costs.append(LIGHT_INDEL_COST if p in LIGHT_INDELS or doubled else INDEL_COST)
+    return costs
+
+
+def align(expected, spoken):
+    """
+    Weighted edit distance between two phoneme sequences. Returns
+    (distance, ops) with ops a list of (expected_index or None,
+    spoken_index or None, cost) in order.
+    """
+    n, m = len(expected), len(spoken)
+    delete = _indel_costs(expected)
+    insert = _indel_costs(spoken)
+
+    dist = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        dist[i][0] = dist[i - 1][0] + delete[i - 1]
+    for j in range(1, m + 1):
+        dist[0][j] = dist[0][j - 1] + insert[j - 1]
+
+    for i in range(1, n + 1):
+        e = expected[i - 1]
+        row, prev = dist[i], dist[i - 1]
+        for j in range(1, m + 1):
+            s = spoken[j - 1]
+            sub = SUBSTITUTION.get((e, s), 0.0 if e == s else 1.0)
+            row[j] = min(
+                prev[j - 1] + sub,
+                prev[j] + delete[i - 1],
+                row[j - 1] + insert[j - 1]
+            )
+
+    ops = []
+    i, j = n, m
+    while i or j:
+        if i and j:
+            e, s = expected[i - 1], spoken[j - 1]
+            sub = SUBSTITUTION.get((e, s), 0.0 if e == s else 1.0)
+            if dist[i][j] == dist[i - 1][j - 1] + sub:
+                ops.append((i - 1, j - 1, sub))
+                i, j = i - 1, j - 1
+                continue
+        if i and dist[i][j] == dist[i - 1][j] + delete[i - 1]:
+            ops.append((i - 1, None, delete[i - 1]))
+            i -= 1
+        else:
+            ops.append((None, j - 1, insert[j - 1]))
+            j -= 1
+    ops.reverse()
+
+    return dist[n][m], ops
+
+
+# --------------------------------------------------
+# PUBLIC API
+# --------------------------------------------------
+def _score_raw(expected: str, spoken: str) -> dict:
+    """
+    Fallback for an expected text with no phonemes (e.g. "2024"): character
+    similarity of the two texts as written, with no syllable diff
+    """
+    expected = " ".join(unicodedata.normalize("NFC", expected).casefold().split())
+    spoken = " ".join(unicodedata.normalize("NFC", spoken).casefold().split())
+    similarity = difflib.SequenceMatcher(None, expected, spoken).ratio() if expected or spoken else 0.0
+    return {
+        "score": round(10 * similarity, 1),
+        "distance": None,
+        "expected": expected,
+        "spoken": spoken,
+        "syllables": []
+    }
+
+
+def score_pronunciation(expected: str, spoken: str, language: str = None) -> dict:
+    """
+    Scores spoken against expected out of 10 and returns the per-syllable
+    diff: [{"expected", "spoken", "status", "cost"}] where status is one of
+    match, close, wrong, missing or extra.
+    """
+    expected_words = to_phonemes(expected, language)
+    spoken_words = to_phonemes(spoken, language)
+
+    # STT splits and joins words freely, so align the whole utterance
+    expected_flat = [p for word in expected_words for p in word]
+    spoken_flat = [p for word in spoken_words for p in word]
+
+    if not expected_flat:
+        return _score_raw(expected, spoken)
+
+    distance, ops = align(expected_flat, spoken_flat)
+
+    worst = max(sum(_indel_costs(expected_flat)), sum(_indel_costs(spoken_flat)))
+    score = round(10 * max(0.0, 1 - distance / worst), 1)
+
+    # Syllable spans over the flattened expected sequence
+    spans = []
+    offset = 0
+    for word in expected_words:
+        spans += [(offset + start, offset + end) for start, end in syllabify(word)]
+        offset += len(word)
+    syllable_of = {}
+    for index, (start, end) in enumerate(spans):
+        for position in range(start, end):
+            syllable_of[position] = index
+
+    spoken_parts = [[] for _ in spans]
+    costs = [0.0] * len(spans)
+    current = None
+    leading_extra = []
+    for e, s, cost in ops:
+        if e is not None:
+            current = syllable_of[e]
+        elif current is None:
+            # Insertions before the first expected phoneme
+            leading_extra.append(spoken_flat[s])
+            continue
+        if s is not None:
+            spoken_parts[current].append(spoken_flat[s])
+        costs[current] += cost
+
+    syllables = []
+    if leading_extra:
+        syllables.append({
+            "expected": "",
+            "spoken": "".join(leading_extra),
+            "status": "extra",
+            "cost": round(sum(_indel_costs(leading_extra)), 2)
+        })
+
+    for (start, end), spoken_part, cost in zip(spans, spoken_parts, costs):
+        if cost == 0:
+            status = "match"
+        elif not spoken_part:
+            status = "missing"
+        elif cost < CLOSE_COST:
+            status = "close"
+        else:
+            status = "wrong"
+        syllables.append({
+            "expected": "".join(expected_flat[start:end]),
+            "spoken": "".join(spoken_part),
+            "status": status,
+            "cost": round(cost, 2)
+        })
+
+    return {
+        "score": score,
+        "distance": round(distance, 2),
+        "expected": " ".join("".join(word) for word in expected_words),
+        "spoken": " ".join("".join(word) for word in spoken_words),
+        "syllables": syllables
+    }
@@ -0,0 +1,354 @@
+'''
+Fingerprinted static assets.
+
+Every file under Frontend/Static is copied into Frontend/Static/build with a
+hash of its content in the name (css/Styles.3f9a1c2b7e.css), so browsers can
+keep it for a year and a changed file simply gets a new URL. On the way:
+
+  - text assets (css, js, svg, ico) get .gz and, when the brotli package is
+    installed, .br siblings, compressed once at the highest level
+  - photos and logos are scaled down to the size the templates show them at
+    (for 2x screens) and also written as WebP
+  - manifest.json maps each source name to its built files
+
+Templates call asset_url("css/Styles.css"), and asset_url("logo.png", "webp")
+for a <picture> source; without a manifest they get the plain /static URL.
+The app rebuilds at startup when a source file has changed, so a deploy
+needs no extra step; it can also be run by hand:
+
+    python -m Backend.static_assets
+'''
+import gzip
+import hashlib
+import io
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+BUILD_VERSION = 1
+
+BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
+SOURCE_DIR = BASE_DIR / "Frontend" / "Static"
+BUILD_DIR = SOURCE_DIR / "build"
+MANIFEST_NAME = "manifest.json"
+
+# Worth precompressing; images and fonts are already compressed
+TEXT_SUFFIXES = {".css", ".js", ".svg", ".ico", ".json", ".txt"}
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+# Largest size (CSS pixels, shorter side) each image is displayed at in the
+# templates. Images are scaled to PIXEL_RATIO times that; others keep their
+# size and are only re-encoded.
+IMAGE_SIZES = {
+    "logo.png": 220,
+    "asd.jpeg": 150,
+    "bms.jpeg": 150,
+    "github.jpeg": 26,
+    "linkedin.jpeg": 26
+}
+PIXEL_RATIO = 2
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# A compressed or WebP copy is only kept when it saves at least this much
+MIN_SAVING = 0.1
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def fingerprinted_name(name: str, data: bytes, suffix: str = None) -> str:
+    path = pathlib.PurePosixPath(name)
+    return str(path.with_name(f"{path.stem}.{fingerprint(data)}{suffix or path.suffix}"))
+
+
+def _write(path: pathlib.Path, data: bytes):
+    """
+    Temp file + rename, so a worker never serves a half written file
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".asset-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _smaller(candidate: bytes, original: bytes) -> bool:
+    return len(candidate) <= len(original) * (1 - MIN_SAVING)
+
+
+# --------------------------------------------------
+# IMAGES
+# --------------------------------------------------
+def _encode(img, fmt: str) -> bytes:
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        img.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        img.save(out, "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        img.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+def optimise_image(name: str, data: bytes):
+    """
+    (fallback bytes in the original format, WebP bytes or None)
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    fmt = img.format
+    resized = False
+
+    size = IMAGE_SIZES.get(name)
+    if size:
+        scale = size * PIXEL_RATIO / min(img.size)
+        if scale < 1:
+            img = img.resize(
+                (round(img.width * scale), round(img.height * scale)),
+                Image.Resampling.LANCZOS
+            )
+            resized = True
+
+    fallback = _encode(img, fmt)
+    if not resized and len(fallback) >= len(data):
+        fallback = data
+
+    webp = _encode(img, "WEBP")
+    return fallback, (webp if _smaller(webp, fallback) else None)
+
+
+# --------------------------------------------------
+# BUILD
+# --------------------------------------------------
+def source_files(source_dir=SOURCE_DIR, build_dir=BUILD_DIR) -> dict:
+    """
+    {posix name relative to source_dir: path} for every servable file
+    """
+    files = {}
+    for path in sorted(pathlib.Path(source_dir).rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        if pathlib.Path(build_dir) in path.parents:
+            continue
+        files[path.relative_to(source_dir).as_posix()] = path
+    return files
+
+
+def _settings_key() -> str:
+    return fingerprint(json.dumps({
+        "version": BUILD_VERSION,
+        "sizes": IMAGE_SIZES,
+        "ratio": PIXEL_RATIO,
+        "jpeg": JPEG_QUALITY,
+        "webp": WEBP_QUALITY,
+        "brotli": brotli is not None
+    }, sort_keys=True).encode("utf-8"))
+
+
+def build(source_dir=SOURCE_DIR, build_dir=BUILD_DIR) -> dict:
+    """
+    Writes the fingerprinted files and manifest.json; returns the manifest
+    """
+    build_dir = pathlib.Path(build_dir)
+    assets = {}
+    written = set()
+
+    for name, path in source_files(source_dir, build_dir).items():
+        data = path.read_bytes()
+        suffix = path.suffix.lower()
+        entry = {"source": fingerprint(data), "encodings": []}
+
+        webp = None
+        if suffix in RASTER_SUFFIXES:
+            try:
+                data, webp = optimise_image(name, data)
+            except Exception as e:
+                print(f"Static asset {name} copied unoptimised:", e)
+
+        entry["file"] = fingerprinted_name(name, data)
+        _write(build_dir / entry["file"], data)
+        written.add(entry["file"])
+
+        if webp is not None:
+            entry["webp"] = fingerprinted_name(name, webp, ".webp")
+            _write(build_dir / entry["webp"], webp)
+            written.add(entry["webp"])
+
+        if suffix in TEXT_SUFFIXES:
+            compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(data, quality=11)
+
+            for encoding, ext in ENCODINGS:
+                if encoding in compressed and _smaller(compressed[encoding], data):
+                    _write(build_dir / (entry["file"] + ext), compressed[encoding])
+                    written.add(entry["file"] + ext)
+                    entry["encodings"].append(encoding)
+
+        assets[name] = entry
+
+    manifest_path = build_dir / MANIFEST_NAME
+    previous = read_manifest(manifest_path)
+
+    manifest = {
+        "built_at": time.time(),
+        "settings": _settings_key(),
+        "assets": assets
+    }
+    _write(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+    # Workers still on the previous manifest (mid deploy) keep their files;
+    # anything older goes
+    keep = written | _manifest_files(previous) | {MANIFEST_NAME}
+    for path in build_dir.rglob("*"):
+        if path.is_file() and path.relative_to(build_dir).as_posix() not in keep:
+            path.unlink()
+
+    return manifest
+
+
+def _manifest_files(manifest) -> set:
+    files = set()
+    for entry in (manifest or {}).get("assets", {}).values():
+        files.add(entry["file"])
+        if "webp" in entry:
+            files.add(entry["webp"])
+        files.update(entry["file"] + ext for encoding, ext in ENCODINGS if encoding in entry["encodings"])
+    return files
+
+
+def read_manifest(path):
+    try:
+        return json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(manifest, source_dir=SOURCE_DIR, build_dir=BUILD_DIR) -> bool:
+    if not manifest or manifest.get("settings") != _settings_key():
+        return True
+
+    assets = manifest["assets"]
+    sources = source_files(source_dir, build_dir)
+    if set(sources) != set(assets):
+        return True
+
+    for name, path in sources.items():
+        if fingerprint(path.read_bytes()) != assets[name]["source"]:
+            return True
+        if not (pathlib.Path(build_dir) / assets[name]["file"]).is_file():
+            return True
+    return False
+
+
+# --------------------------------------------------
+# LOOKUP
+# --------------------------------------------------
+class StaticAssets:
+    def __init__(self, source_dir=SOURCE_DIR, build_dir=BUILD_DIR):
+        self.source_dir = pathlib.Path(source_dir)
+        self.build_dir = pathlib.Path(build_dir)
+
+        self._assets = {}
+        # built file -> encodings it has precompressed siblings for
+        self._encodings = {}
+
+    def load(self, rebuild: bool = True) -> bool:
+        """
+        Reads the manifest, rebuilding it first when rebuild is set and a
+        source has changed; returns whether fingerprinted URLs are in use
+        """
+        manifest = read_manifest(self.build_dir / MANIFEST_NAME)
+
+        if rebuild and is_stale(manifest, self.source_dir, self.build_dir):
+            try:
+                manifest = build(self.source_dir, self.build_dir)
+            except OSError as e:
+                # Read-only checkout: plain /static URLs still work
+                print("Static assets not built:", e)
+                manifest = None
+
+        if not manifest:
+            return False
+
+        self._assets = manifest["assets"]
+        self._encodings = {entry["file"]: entry["encodings"] for entry in self._assets.values()}
+        return True
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._assets)
+
+    def lookup(self, name: str, variant: str = None):
+        """
+        Built file (relative to build_dir) for a source name, or None.
+        variant="webp" asks for the WebP copy of an image.
+        """
+        entry = self._assets.get(name)
+        if entry is None:
+            return None
+        return entry.get(variant) if variant else entry["file"]
+
+    def encoded(self, filename: str, accepts):
+        """
+        (file to send, Content-Encoding or None) for a built file, picking
+        the best precompressed copy the client accepts (accepts(encoding)
+        -> bool)
+        """
+        for encoding, ext in ENCODINGS:
+            if encoding in self._encodings.get(filename, ()) and accepts(encoding):
+                return filename + ext, encoding
+        return filename, None
+
+    def stats(self) -> dict:
+        return {
+            "assets": len(self._assets),
+            "webp": sum(1 for entry in self._assets.values() if "webp" in entry),
+            "precompressed": sum(1 for entry in self._assets.values() if entry["encodings"])
+        }
+
+
+def main():
+    started = time.perf_counter()
+    manifest = build()
+
+    source = built = 0
+    for name, entry in manifest["assets"].items():
+        source += (SOURCE_DIR / name).stat().st_size
+        best = [entry["file"]] + [entry["file"] + ext for encoding, ext in ENCODINGS if encoding in entry["encodings"]]
+        if "webp" in entry:
+            best.append(entry["webp"])
+        built += min((BUILD_DIR / path).stat().st_size for path in best)
+
+    print(
+        f"Built {len(manifest['assets'])} assets into {BUILD_DIR} in "
+        f"{time.perf_counter() - started:.2f}s: {source / 1024:.0f} KB -> {built / 1024:.0f} KB "
+        f"(brotli {'on' if brotli else 'off, pip install brotli'})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
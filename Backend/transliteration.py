@@ -0,0 +1,254 @@
+'''
+English-script → native-script transliteration.
+
+TRANSLITERATION_BACKENDS (comma separated, default "google,sanscript")
+lists the backends in use. Learners type casual romanisations (kozhikode,
+dharti, chhadna, even English words), which Google Input Tools handles and
+the local indic_transliteration engine does not: sanscript is strict ITRANS
+only and turns "kozhikode" into കോഴികോദേ. So Google goes first, with
+sanscript as the offline fallback, except for input that is recognisably
+strict ITRANS (capitals inside a word, e.g. "raamaH", "shivaM"), which
+sanscript maps exactly. A backend whose output still has Latin letters is
+skipped.
+
+Results are memoized per process and, once use_shared_cache() has been
+called, stored in the cross-worker cache so a word is only transliterated
+once per box. A failed lookup (every backend down) is not cached.
+'''
+import functools
+import os
+import re
+
+from Backend.ApiCalls.clients import call, get_http_session
+from Backend.cache.audio import normalize_text
+from Backend.metrics import timed
+
+
+# --------------------------------------------------
+# LANGUAGE MAPS
+# --------------------------------------------------
+GOOGLE_LANG_MAP = {
+    "Hindi": "hi",
+    "Bengali": "bn",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Gujarati": "gu",
+    "Kannada": "kn",
+    "Malayalam": "ml",
+    "Marathi": "mr",
+    "Punjabi": "pa",
+    "Odia": "or"
+}
+
+# Scripts that write a word-final "m" as an anusvara rather than with a virama
+ANUSVARA_FINAL_M = {"Malayalam", "Telugu", "Kannada"}
+
+# Casual spellings that plain ITRANS would split into the wrong conjunct
+CASUAL_ITRANS = (
+    ("ksh", "x"),
+)
+
+DEFAULT_BACKENDS = "google,sanscript"
+MEMO_SIZE = int(os.getenv("TRANSLITERATION_MEMO_SIZE", 4096))
+
+
+def is_english(text: str) -> bool:
+    return bool(re.fullmatch(r"[A-Za-z\s]+", text))
+
+
+def is_strict_itrans(text: str) -> bool:
+    """
+    ITRANS marks long vowels, retroflexes, anusvara and visarga with capitals
+    (aA, T, D, N, M, H); casual spelling only capitalises a word's first letter
+    """
+    return re.search(r"[A-Za-z][A-Z]", text) is not None
+
+
+# --------------------------------------------------
+# BACKENDS
+# --------------------------------------------------
+class SanscriptTransliterator:
+    """
+    Offline ITRANS → native script using indic_transliteration
+    """
+    name = "sanscript"
+
+    def __init__(self):
+        from indic_transliteration import sanscript
+
+        self._sanscript = sanscript
+        self.lang_map = {
+            "Hindi": sanscript.DEVANAGARI,
+            "Bengali": sanscript.BENGALI,
+            "Tamil": sanscript.TAMIL,
+            "Telugu": sanscript.TELUGU,
+            "Gujarati": sanscript.GUJARATI,
+            "Kannada": sanscript.KANNADA,
+            "Malayalam": sanscript.MALAYALAM,
+            "Marathi": sanscript.DEVANAGARI,
+            "Punjabi": sanscript.GURMUKHI,
+            "Odia": sanscript.ORIYA
+        }
+
+    def transliterate(self, text: str, language: str):
+        script = self.lang_map.get(language)
+        if not script:
+            return None
+
+        # Strict ITRANS is taken as written. Otherwise casual capitals
+        # ("Namaste") are dropped, since ITRANS gives capitals meaning.
+        itrans = text
+        if not is_strict_itrans(text):
+            itrans = text.lower()
+            for casual, canonical in CASUAL_ITRANS:
+                itrans = itrans.replace(casual, canonical)
+            if language in ANUSVARA_FINAL_M:
+                itrans = re.sub(r"m\b", "M", itrans)
+
+        return self._sanscript.transliterate(itrans, self._sanscript.ITRANS, script)
+
+
+class GoogleInputToolsTransliterator:
+    """
+    Remote transliteration through the Google Input Tools endpoint
+    """
+    name = "google"
+    URL = "https://inputtools.google.com/request"
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+
+    def transliterate(self, text: str, language: str):
+        lang_code = GOOGLE_LANG_MAP.get(language)
+        if not lang_code:
+            return None
+
+        def fetch():
+            response = get_http_session().get(
+                self.URL,
+                params={
+                    "text": text,
+                    "itc": f"{lang_code}-t-i0-und",
+                    "num": 1
+                },
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+
+        response = call("google_input_tools", "transliterate", fetch)
+
+        if response[0] == "SUCCESS":
+            return response[1][0][1][0]
+        return None
+
+
+BACKENDS = {
+    SanscriptTransliterator.name: SanscriptTransliterator,
+    GoogleInputToolsTransliterator.name: GoogleInputToolsTransliterator,
+}
+
+
+def load_backends(names: str):
+    backends = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        try:
+            backends.append(BACKENDS[name]())
+        except KeyError:
+            print("Unknown transliteration backend:", name)
+        except ImportError as e:
+            print(f"Transliteration backend {name} unavailable:", e)
+    return backends
+
+
+# Loaded on first use (or by the app's preload) rather than at import, so
+# importing the app does not pull in the sanscript tables
+_backends = None
+
+
+def get_backends() -> list:
+    global _backends
+    if _backends is None:
+        _backends = load_backends(os.getenv("TRANSLITERATION_BACKENDS", DEFAULT_BACKENDS))
+    return _backends
+
+# cache.shared.SharedCache set by the app; None keeps the memo process-local
+_shared_cache = None
+
+
+def use_shared_cache(cache):
+    global _shared_cache
+    _shared_cache = cache
+
+
+# --------------------------------------------------
+# PUBLIC API
+# --------------------------------------------------
+class _Untransliterated(Exception):
+    """
+    Raised out of the memoized function so lru_cache does not keep a miss
+    """
+
+
+@timed("transliterate_to_native")
+def transliterate_to_native(text: str, language: str) -> str:
+    if language not in GOOGLE_LANG_MAP or not is_english(text):
+        return text
+
+    try:
+        return _transliterate_memoized(text, language)
+    except _Untransliterated:
+        # Typically a backend outage: the raw text is used this time and
+        # the next request tries again
+        return text
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def _transliterate_memoized(text: str, language: str) -> str:
+    if _shared_cache is None:
+        result = _run_backends(text, language)
+    else:
+        key = f"{language}\x1f{normalize_text(text)}"
+        result = _shared_cache.get_or_compute(key, lambda: _run_backends(text, language))
+
+    if not result:
+        raise _Untransliterated(text)
+    return result
+
+
+def _backend_order(text: str) -> list:
+    backends = get_backends()
+    if is_strict_itrans(text):
+        return sorted(backends, key=lambda backend: backend.name != SanscriptTransliterator.name)
+    return backends
+
+
+def _run_backends(text: str, language: str):
+    """
+    First backend result with no Latin letters left, or None
+    """
+    for backend in _backend_order(text):
+        try:
+            result = backend.transliterate(text, language)
+        except Exception as e:
+            print(f"Transliteration error ({backend.name}):", e)
+            continue
+
+        # Leftover Latin letters mean the backend could not map everything
+        if result and not re.search(r"[A-Za-z]", result):
+            return result
+
+    return None
+
+
+def memo_stats() -> dict:
+    info = _transliterate_memoized.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "entries": info.currsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_ratio": round(info.hits / lookups, 3) if lookups else 0.0
+    }
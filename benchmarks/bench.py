@@ -0,0 +1,505 @@
+'''
+Offline benchmark for the learn and check pipelines.
+
+Sarvam (TTS / chat / STT) and Google Input Tools are replaced with local
+fakes that sleep for an injected latency, and the reference wavs in
+Data/correct_pronunciation_output are used as TTS output and /check uploads,
+so runs need no network and no API key. Each stage runs in its own spawned
+process so its peak RSS is measured in isolation.
+
+    python -m benchmarks.bench
+    python -m benchmarks.bench --stages learn_cold,check --latency-ms 300
+    python -m benchmarks.bench --save-baseline
+    python -m benchmarks.bench --baseline benchmarks/baseline.json --tolerance 0.25
+
+Exits with status 1 when a stage regresses past the tolerance (p95 latency
+up or throughput down) relative to the baseline.
+'''
+import argparse
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import pathlib
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+FIXTURES_DIR = PROJECT_ROOT / "Data" / "correct_pronunciation_output"
+DEFAULT_BASELINE = pathlib.Path(__file__).resolve().parent / "baseline.json"
+
+LANGUAGES = (
+    "Hindi", "Bengali", "Tamil", "Telugu", "Gujarati",
+    "Kannada", "Malayalam", "Marathi", "Punjabi", "Odia"
+)
+
+STAGES = (
+    "learn_cold",
+    "learn_warm",
+    "check",
+    "score",
+    "preprocess",
+    "preprocess_batch",
+    "ocr",
+    "boot",
+)
+
+
+# --------------------------------------------------
+# FIXTURES
+# --------------------------------------------------
+def load_fixtures():
+    """
+    [(path, text, language)] parsed from "<text><Language>.wav" filenames
+    """
+    fixtures = []
+    for path in sorted(FIXTURES_DIR.glob("*.wav")):
+        stem = path.stem
+        for language in LANGUAGES:
+            if stem.endswith(language):
+                text = stem[:-len(language)].replace("_", "").strip()
+                fixtures.append((path, text, language))
+                break
+    return fixtures
+
+
+# --------------------------------------------------
+# FAKE APIS
+# --------------------------------------------------
+class Latency:
+    def __init__(self, mean_ms, jitter, seed):
+        self.mean = mean_ms / 1000
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    def wait(self):
+        if self.mean > 0:
+            spread = self.mean * self.jitter
+            time.sleep(max(0.0, self.rng.uniform(self.mean - spread, self.mean + spread)))
+
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeSarvam:
+    """
+    Stands in for SarvamAI: text_to_speech.convert, chat.completions and
+    speech_to_text.transcribe, each sleeping for the injected latency.
+    """
+
+    def __init__(self, latency, fixtures):
+        self.latency = latency
+        self._audio = base64.b64encode(fixtures[0][0].read_bytes()).decode()
+        # /check saves uploads under a random temp name, so match on content,
+        # both as uploaded and as trimmed / resampled before STT
+        from Backend.audio_prep import prepare_for_stt
+
+        self._transcripts = {}
+        for path, text, _ in fixtures:
+            raw = path.read_bytes()
+            prepared, _ = prepare_for_stt(raw, path.name)
+            for audio in (raw, prepared):
+                self._transcripts[hashlib.sha256(audio).hexdigest()] = text
+
+        self.text_to_speech = _Obj(convert=self._convert)
+        self.chat = _Obj(completions=self._completions)
+        self.speech_to_text = _Obj(transcribe=self._transcribe)
+
+    def _convert(self, text, **kwargs):
+        self.latency.wait()
+        return _Obj(audios=[self._audio])
+
+    def _completions(self, messages, **kwargs):
+        self.latency.wait()
+        prompt = messages[-1]["content"]
+        # Batched prompts list "<n>. <word>" lines and expect "### <n>" answers
+        numbered = re.findall(r"^(\d+)\. (.+)$", prompt, re.MULTILINE)
+        if numbered:
+            content = "\n\n".join(
+                f"### {number}\n**{word}**\n\nSay it slowly, one syllable at a time."
+                for number, word in numbered
+            )
+        else:
+            word = prompt.rsplit(":", 1)[-1].strip()
+            content = f"**{word}**\n\nSay it slowly, one syllable at a time."
+        return _Obj(choices=[_Obj(message=_Obj(content=content))])
+
+    def _transcribe(self, file, **kwargs):
+        self.latency.wait()
+        audio = file[1] if isinstance(file, tuple) else file.read()
+        return _Obj(transcript=self._transcripts.get(hashlib.sha256(audio).hexdigest(), ""))
+
+
+class FakeGoogleTransliterator:
+    name = "google"
+
+    def __init__(self, latency, local):
+        self.latency = latency
+        self.local = local
+
+    def transliterate(self, text, language):
+        self.latency.wait()
+        return self.local.transliterate(text, language)
+
+
+# --------------------------------------------------
+# STAGES
+# --------------------------------------------------
+def _load_app(options, workdir):
+    os.environ.setdefault("SARVAM_API_KEY", "benchmark")
+    os.environ["UCHAARAN_CACHE_DIR"] = str(workdir / "cache")
+    # Cold stages must pay for every call, so no precomputed pack is mapped
+    os.environ["PRONUNCIATION_PACK"] = str(workdir / "absent.pack")
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+    from Backend import app as app_module
+    from Backend import transliteration
+
+    fixtures = load_fixtures()
+    latency = Latency(options["latency_ms"], options["jitter"], options["seed"])
+    app_module.client = FakeSarvam(latency, fixtures)
+
+    local = transliteration.SanscriptTransliterator()
+    if options["transliteration"] == "google":
+        transliteration._backends = [FakeGoogleTransliterator(latency, local)]
+    else:
+        transliteration._backends = [local]
+
+    _reset_caches(app_module, workdir)
+    return app_module, fixtures
+
+
+def _reset_caches(app_module, workdir):
+    from Backend import transliteration
+    from Backend.cache.audio import AudioCache
+    from Backend.cache.phonetic import PhoneticHelpStore
+    from Backend.cache.shared import SharedCache
+    from Backend.cache.transcripts import TranscriptStore
+
+    run_dir = pathlib.Path(tempfile.mkdtemp(dir=workdir))
+    app_module.audio_cache = AudioCache(run_dir / "audio")
+    app_module.phonetic_store = PhoneticHelpStore(
+        run_dir / "phonetic_help.sqlite3",
+        prompt_version=app_module.PHONETIC_PROMPT_VERSION,
+        model_params=app_module.PHONETIC_MODEL_PARAMS
+    )
+    app_module.transcript_store = TranscriptStore(run_dir / "transcripts.sqlite3")
+    app_module.transliteration_cache = SharedCache(run_dir / "shared.sqlite3", "transliteration")
+    transliteration.use_shared_cache(app_module.transliteration_cache)
+    transliteration._transliterate_memoized.cache_clear()
+
+
+def _timed_ops(ops):
+    latencies = []
+    for op in ops:
+        start = time.perf_counter()
+        op()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def stage_learn(options, workdir, warm):
+    app_module, _ = _load_app(options, workdir)
+    words = list(app_module.WORD_LANGUAGE_MAP.items())
+    latencies = []
+
+    for _ in range(options["iterations"]):
+        if warm:
+            for word, language in words:
+                app_module.process_learn(language, word)
+        latencies += _timed_ops(
+            lambda w=word, l=language: app_module.process_learn(l, w)
+            for word, language in words
+        )
+        _reset_caches(app_module, workdir)
+
+    return latencies
+
+
+def stage_check(options, workdir):
+    app_module, fixtures = _load_app(options, workdir)
+    client = app_module.app.test_client()
+
+    def post(path, text, language):
+        with open(path, "rb") as f:
+            response = client.post(
+                "/check",
+                data={
+                    "language": language,
+                    "expected_text": text,
+                    "audio": (f, path.name)
+                },
+                content_type="multipart/form-data"
+            )
+        if response.status_code != 200:
+            raise RuntimeError(f"/check returned {response.status_code}")
+
+    return _timed_ops(
+        lambda p=path, t=text, l=language: post(p, t, l)
+        for _ in range(options["iterations"])
+        for path, text, language in fixtures
+    )
+
+
+def stage_score(options, workdir):
+    _, fixtures = _load_app(options, workdir)
+    from Backend.scoring import score_pronunciation
+
+    rng = random.Random(options["seed"])
+
+    pairs = []
+    for _, text, language in fixtures:
+        chars = list(text)
+        if len(chars) > 1:
+            chars[rng.randrange(len(chars))] = chars[rng.randrange(len(chars))]
+        pairs.append((text, "".join(chars), language))
+
+    return _timed_ops(
+        lambda e=expected, s=spoken, l=language: score_pronunciation(e, s, l)
+        for _ in range(options["iterations"] * 50)
+        for expected, spoken, language in pairs
+    )
+
+
+def _synthetic_pages(count, seed):
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    pages = []
+    for i in range(count):
+        page = np.full((1200, 900, 3), 235, np.uint8)
+        page += rng.integers(0, 20, page.shape, dtype=np.uint8)
+        for line in range(20):
+            cv2.putText(
+                page, f"namaste vizhinjam pazham {i}-{line}", (40, 60 + line * 55),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.1, (20, 20, 20), 2
+            )
+        pages.append(page)
+    return pages
+
+
+def stage_preprocess(options, workdir, batch):
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from Backend.ApiCalls.ocr import preprocess
+
+    pages = _synthetic_pages(8, options["seed"])
+    latencies = []
+
+    for _ in range(options["iterations"]):
+        for script, spec in preprocess.PIPELINES.items():
+            if batch:
+                latencies += _timed_ops([lambda s=script: preprocess.preprocess_batch(pages, s)])
+            else:
+                latencies += _timed_ops(
+                    lambda p=page, s=spec: preprocess.run_pipeline(p, s)
+                    for page in pages
+                )
+    return latencies
+
+
+def stage_ocr(options, workdir):
+    if shutil.which("tesseract") is None:
+        return None
+
+    import cv2
+
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from Backend.ApiCalls.ocr.tesseract_ocr import extract_text_from_image
+
+    pages = [cv2.imencode(".png", p)[1].tobytes() for p in _synthetic_pages(3, options["seed"])]
+    return _timed_ops(
+        lambda data=page: extract_text_from_image(data)
+        for _ in range(options["iterations"])
+        for page in pages
+    )
+
+
+def stage_boot(options, workdir):
+    """
+    A fresh interpreter importing the app through create_app() with no API
+    key, as a gunicorn worker does when the master does not preload
+    """
+    env = {k: v for k, v in os.environ.items() if k != "SARVAM_API_KEY"}
+    env.update(
+        UCHAARAN_CACHE_DIR=str(workdir / "cache"),
+        PRONUNCIATION_PACK=str(workdir / "absent.pack"),
+        APP_PRELOAD="0"
+    )
+    command = [sys.executable, "-c", "from Backend.app import create_app; create_app()"]
+
+    return _timed_ops(
+        lambda: subprocess.run(command, cwd=PROJECT_ROOT, env=env, check=True, capture_output=True)
+        for _ in range(options["iterations"] * 3)
+    )
+
+
+def run_stage(name, options):
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix=f"bench-{name}-"))
+    try:
+        if name == "learn_cold":
+            latencies = stage_learn(options, workdir, warm=False)
+        elif name == "learn_warm":
+            latencies = stage_learn(options, workdir, warm=True)
+        elif name == "check":
+            latencies = stage_check(options, workdir)
+        elif name == "score":
+            latencies = stage_score(options, workdir)
+        elif name == "preprocess":
+            latencies = stage_preprocess(options, workdir, batch=False)
+        elif name == "preprocess_batch":
+            latencies = stage_preprocess(options, workdir, batch=True)
+        elif name == "ocr":
+            latencies = stage_ocr(options, workdir)
+        elif name == "boot":
+            latencies = stage_boot(options, workdir)
+        else:
+            raise ValueError(f"Unknown stage: {name}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if latencies is None:
+        return {"skipped": True}
+
+    # ru_maxrss is KiB on Linux. Boot measures fresh interpreters, so its
+    # peak is the largest child's rather than the bench process's own.
+    who = resource.RUSAGE_CHILDREN if name == "boot" else resource.RUSAGE_SELF
+    peak_rss_kb = resource.getrusage(who).ru_maxrss
+    return summarize(latencies, peak_rss_kb)
+
+
+# --------------------------------------------------
+# REPORTING
+# --------------------------------------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, peak_rss_kb):
+    """
+    Ops run back to back, so throughput is taken over measured time only
+    (imports, cache priming and fixture setup are excluded)
+    """
+    ordered = sorted(latencies)
+    busy = sum(ordered)
+    return {
+        "ops": len(ordered),
+        "throughput": round(len(ordered) / busy, 2) if busy else 0.0,
+        "p50_ms": round(1000 * percentile(ordered, 50), 3),
+        "p95_ms": round(1000 * percentile(ordered, 95), 3),
+        "p99_ms": round(1000 * percentile(ordered, 99), 3),
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1)
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous or current.get("skipped") or previous.get("skipped"):
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {previous['throughput']}/s -> {current['throughput']}/s"
+            )
+    return regressions
+
+
+def print_table(results, baseline):
+    header = f"{'stage':<18}{'ops':>7}{'ops/s':>11}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        if r.get("skipped"):
+            print(f"{name:<18}  skipped")
+            continue
+        line = (
+            f"{name:<18}{r['ops']:>7}{r['throughput']:>11}{r['p50_ms']:>11}"
+            f"{r['p95_ms']:>11}{r['p99_ms']:>11}{r['peak_rss_mb']:>9}"
+        )
+        previous = baseline.get("stages", {}).get(name) if baseline else None
+        if previous and not previous.get("skipped") and previous["p95_ms"]:
+            change = (r["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"   p95 {change:+.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated subset of: " + ", ".join(STAGES))
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=150, help="mean injected latency of each fake API call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency spread as a fraction of the mean")
+    parser.add_argument("--transliteration", choices=("sanscript", "google"), default="sanscript")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--baseline", type=pathlib.Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--json", type=pathlib.Path, help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    options = {
+        "iterations": args.iterations,
+        "latency_ms": args.latency_ms,
+        "jitter": args.jitter,
+        "transliteration": args.transliteration,
+        "seed": args.seed,
+    }
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for name in stages:
+            results[name] = pool.apply(run_stage, (name, options))
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("options") != options:
+            print("Note: baseline was recorded with different options:", baseline.get("options"))
+
+    print_table(results, baseline)
+
+    report = {"options": options, "stages": results}
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print("Saved baseline to", args.baseline)
+        return 0
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("\nNo regressions against", args.baseline)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import itertools
+import pathlib
+import re
+
+import numpy as np
+import pytest
+
+from Backend import audio_prep
+from Backend.cache.transcripts import MATCH_THRESHOLD, MIN_FINGERPRINT_FRAMES, TranscriptStore
+
+
+REFERENCE_DIR = pathlib.Path(__file__).resolve().parent.parent / "Data" / "correct_pronunciation_output"
+
+
+def _reference_clips():
+    """
+    {language: [(name, samples)]}, with recordings saved under two names
+    (same audio, different filename escaping) kept once
+    """
+    clips = {}
+    seen = set()
+    for path in sorted(REFERENCE_DIR.glob("*.wav")):
+        samples = audio_prep.normalize(path.read_bytes())
+        if samples is None:
+            continue
+        wav = audio_prep.encode_wav(samples)
+        if wav in seen:
+            continue
+        seen.add(wav)
+        language = re.search(r"([A-Z][a-z]+)\.wav$", path.name).group(1)
+        clips.setdefault(language, []).append((path.name, samples))
+    return clips
+
+
+def _distance(a, b):
+    bits_a, frames_a = audio_prep.fingerprint(a)
+    bits_b, frames_b = audio_prep.fingerprint(b)
+    return audio_prep.fingerprint_distance(bits_a, frames_a, bits_b, frames_b)
+
+
+def _perturbed(samples):
+    # A slightly different take of the same audio: small gain change and
+    # noise, enough to change the exact hash
+    noise = np.random.default_rng(0).normal(0, 1e-4, len(samples))
+    return (samples * 0.9 + noise).astype(samples.dtype)
+
+
+def _long_clip():
+    for clips in _reference_clips().values():
+        for name, samples in clips:
+            if audio_prep.fingerprint(samples)[1] >= MIN_FINGERPRINT_FRAMES:
+                return samples
+    pytest.skip("no reference clip long enough to fingerprint")
+
+
+def test_distinct_words_in_one_language_are_far_apart():
+    pairs = 0
+    for language, clips in _reference_clips().items():
+        for (name_a, a), (name_b, b) in itertools.combinations(clips, 2):
+            pairs += 1
+            distance = _distance(a, b)
+            assert distance > 4 * MATCH_THRESHOLD, (language, name_a, name_b, distance)
+    assert pairs
+
+
+def test_fingerprint_match_is_off_by_default(tmp_path):
+    samples = _long_clip()
+    store = TranscriptStore(tmp_path / "t.sqlite3")
+    store.put(audio_prep.encode_wav(samples), audio_prep.fingerprint(samples), "ml-IN", "first take")
+
+    retry = _perturbed(samples)
+    assert store.get(audio_prep.encode_wav(retry), audio_prep.fingerprint(retry), "ml-IN") is None
+
+
+def test_fingerprint_match_skips_reference_rows(tmp_path):
+    samples = _long_clip()
+    retry = _perturbed(samples)
+    assert _distance(samples, retry) <= MATCH_THRESHOLD
+
+    store = TranscriptStore(tmp_path / "t.sqlite3", fingerprint_match=True)
+    store.put(audio_prep.encode_wav(samples), audio_prep.fingerprint(samples), "ml-IN", "expected", source="tts")
+    assert store.get(audio_prep.encode_wav(retry), audio_prep.fingerprint(retry), "ml-IN") is None
+    # The reference itself still hits on its exact hash
+    assert store.get(audio_prep.encode_wav(samples), audio_prep.fingerprint(samples), "ml-IN") == "expected"
+
+    # A learner's own earlier take (source "stt") is matched
+    store.put(audio_prep.encode_wav(samples), audio_prep.fingerprint(samples), "ml-IN", "first take")
+    assert store.get(audio_prep.encode_wav(retry), audio_prep.fingerprint(retry), "ml-IN") == "first take"